@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import UserProfile, Competition, Essay, Paragraph
+from django.utils import timezone
+from .models import UserProfile, Competition, Essay, Paragraph, ScoringJob
+from .fragments import invalidate_competition
+from .stats import invalidate_stats
 
 class UserProfileInline(admin.StackedInline):
     """
@@ -61,23 +64,27 @@ class EssayAdmin(admin.ModelAdmin):
     list_display = ['user', 'competition', 'status', 'paragraph_count', 'word_count', 'started_at', 'completed_at']
     list_filter = ['status', 'competition', 'started_at']
     search_fields = ['user__username', 'competition__title']
-    readonly_fields = ['started_at', 'completed_at', 'word_count']
+    readonly_fields = ['started_at', 'completed_at', 'word_count', 'paragraph_count']
     inlines = [ParagraphInline]
     date_hierarchy = 'started_at'
     
-    def paragraph_count(self, obj):
-        return obj.current_paragraph_count()
-    paragraph_count.short_description = 'Paragraphs'
-    
     actions = ['lock_essays', 'unlock_essays']
     
     def lock_essays(self, request, queryset):
+        competition_ids = set(queryset.values_list('competition_id', flat=True))
         updated = queryset.update(status='locked')
+        invalidate_stats()
+        for competition_id in competition_ids:
+            invalidate_competition(competition_id)
         self.message_user(request, f'{updated} essays were locked.')
     lock_essays.short_description = 'Lock selected essays'
     
     def unlock_essays(self, request, queryset):
+        competition_ids = set(queryset.values_list('competition_id', flat=True))
         updated = queryset.filter(status='locked').update(status='completed')
+        invalidate_stats()
+        for competition_id in competition_ids:
+            invalidate_competition(competition_id)
         self.message_user(request, f'{updated} essays were unlocked.')
     unlock_essays.short_description = 'Unlock selected essays'
 
@@ -93,6 +100,22 @@ class UserProfileAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
 
 
+@admin.register(ScoringJob)
+class ScoringJobAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the essay scoring queue
+    """
+    list_display = ['essay', 'status', 'attempts', 'available_at', 'updated_at']
+    list_filter = ['status']
+    readonly_fields = ['essay', 'attempts', 'last_error', 'locked_at', 'created_at', 'updated_at']
+    actions = ['requeue_jobs']
+
+    def requeue_jobs(self, request, queryset):
+        updated = queryset.exclude(status='running').update(status='queued', attempts=0, available_at=timezone.now())
+        self.message_user(request, f'{updated} jobs were re-queued.')
+    requeue_jobs.short_description = 'Re-queue selected jobs'
+
+
 # Unregister the default User admin and register custom one
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Persistent embedding store.
+
+Essay text never changes after completion, so its embedding is stored as
+compact float32 bytes keyed by sha256(model name + text) and looked up
+before running the encoder.
+
+Lookups stay reads: ``last_used_at`` is only refreshed once it is older
+than ``EMBEDDING_CACHE_TOUCH_INTERVAL``, and the size bound is checked
+after every ``EMBEDDING_CACHE_EVICT_EVERY`` entries this process added
+rather than on every miss.
+"""
+import hashlib
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+# Keys per IN (...) lookup, well under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+# entries this process added since the size bound was last checked
+_added = 0
+
+
+def max_entries():
+    return getattr(settings, 'EMBEDDING_CACHE_MAX_ENTRIES', 100000)
+
+
+def touch_interval():
+    return getattr(settings, 'EMBEDDING_CACHE_TOUCH_INTERVAL', 3600)
+
+
+def evict_every():
+    return getattr(settings, 'EMBEDDING_CACHE_EVICT_EVERY', 1000)
+
+
+def make_key(model_name, text):
+    return hashlib.sha256(f'{model_name}\0{text}'.encode('utf-8')).hexdigest()
+
+
+def _count(hits, misses):
+    with _stats_lock:
+        _stats['hits'] += hits
+        _stats['misses'] += misses
+
+
+def stats():
+    """
+    Hit/miss counters of this process
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def cached_encode(model_name, texts, encode):
+    """
+    Return a float32 matrix of embeddings for ``texts``, calling
+    ``encode(list_of_texts)`` only for texts not found in the store.
+    """
+    from competition.models import EmbeddingCache
+
+    keys = [make_key(model_name, text) for text in texts]
+    unique_keys = list(dict.fromkeys(keys))
+    now = timezone.now()
+    touch_before = now - timedelta(seconds=touch_interval())
+    found = {}
+    stale = []
+    for start in range(0, len(unique_keys), LOOKUP_CHUNK):
+        for key, dim, vector, last_used_at in (
+            EmbeddingCache.objects
+            .filter(key__in=unique_keys[start:start + LOOKUP_CHUNK])
+            .values_list('key', 'dim', 'vector', 'last_used_at')
+        ):
+            found[key] = np.frombuffer(bytes(vector), dtype=np.float32, count=dim)
+            if last_used_at < touch_before:
+                stale.append(key)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing.setdefault(key, text)
+    _count(len(keys) - sum(1 for key in keys if key in missing), len(missing))
+
+    for start in range(0, len(stale), LOOKUP_CHUNK):
+        EmbeddingCache.objects.filter(key__in=stale[start:start + LOOKUP_CHUNK]).update(last_used_at=now)
+
+    if missing:
+        vectors = np.asarray(encode(list(missing.values())), dtype=np.float32)
+        rows = []
+        for key, vec in zip(missing, vectors):
+            found[key] = vec
+            rows.append(EmbeddingCache(
+                key=key, model_name=model_name, dim=vec.shape[0], vector=vec.tobytes(),
+            ))
+        EmbeddingCache.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+        note_added(len(rows))
+
+    return np.stack([found[key] for key in keys])
+
+
+def note_added(count):
+    """
+    Check the size bound once enough entries were added since the last check
+    """
+    global _added
+    with _stats_lock:
+        _added += count
+        due = _added >= evict_every()
+        if due:
+            _added = 0
+    if due:
+        evict()
+
+
+def evict(limit=None):
+    """
+    Drop the least recently used entries above the size bound
+    """
+    from competition.models import EmbeddingCache
+
+    limit = max_entries() if limit is None else limit
+    excess = EmbeddingCache.objects.count() - limit
+    if excess <= 0:
+        return 0
+    stale = EmbeddingCache.objects.order_by('last_used_at', 'id').values_list('pk', flat=True)[:excess]
+    deleted, _ = EmbeddingCache.objects.filter(pk__in=list(stale)).delete()
+    return deleted
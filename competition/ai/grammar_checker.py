@@ -0,0 +1,22 @@
+from competition.metrics import track_nlp
+
+from .registry import get_model
+
+
+def check_text(text):
+    """
+    Return (grammar_errors, spelling_errors) found by LanguageTool
+    """
+    grammar_errors = 0
+    spelling_errors = 0
+
+    with track_nlp():
+        matches = get_model('grammar').check(text)
+
+    for match in matches:
+        if match.rule_issue_type == 'misspelling':
+            spelling_errors += 1
+        else:
+            grammar_errors += 1
+
+    return grammar_errors, spelling_errors
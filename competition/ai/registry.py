@@ -0,0 +1,120 @@
+"""
+Lazily loaded NLP models.
+
+LanguageTool starts a JVM and the sentence transformer loads its weights
+from disk, so both are only built on first use (or by an explicit warm-up)
+instead of at import time.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Settings that decide which model a loader builds
+MODEL_SETTINGS = {'NLP_STUB_MODELS', 'GRAMMAR_LANGUAGE', 'TOPIC_MODEL_NAME'}
+
+_models = {}
+_load_times = {}
+_lock = threading.Lock()
+_use_stubs = False
+
+
+def stubs_enabled():
+    return _use_stubs or getattr(settings, 'NLP_STUB_MODELS', False)
+
+
+def use_stub_models(enabled=True):
+    """
+    Switch to the deterministic models in ``competition.ai.stubs``
+    (benchmarks, offline runs) and drop any loaded models.
+    """
+    global _use_stubs
+    with _lock:
+        _use_stubs = enabled
+        _models.clear()
+        _load_times.clear()
+
+
+@receiver(setting_changed)
+def drop_models_on_setting_change(setting, **kwargs):
+    """
+    Models loaded under the old value would keep being served otherwise
+    (``override_settings`` in tests)
+    """
+    if setting in MODEL_SETTINGS:
+        with _lock:
+            _models.clear()
+            _load_times.clear()
+
+
+def _load_grammar():
+    if stubs_enabled():
+        from .stubs import StubGrammarTool
+        return StubGrammarTool()
+    import language_tool_python
+    return language_tool_python.LanguageTool(getattr(settings, 'GRAMMAR_LANGUAGE', 'en-US'))
+
+
+def _load_embedding():
+    if stubs_enabled():
+        from .stubs import StubEncoder
+        return StubEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(embedding_model_name())
+
+
+LOADERS = {
+    'grammar': _load_grammar,
+    'embedding': _load_embedding,
+}
+
+
+def embedding_model_name():
+    if stubs_enabled():
+        from .stubs import STUB_EMBEDDING_MODEL_NAME
+        return STUB_EMBEDDING_MODEL_NAME
+    return getattr(settings, 'TOPIC_MODEL_NAME', 'all-MiniLM-L6-v2')
+
+
+def get_model(name):
+    """
+    Return the named model, loading it on first use
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        if name not in _models:
+            started = time.perf_counter()
+            _models[name] = LOADERS[name]()
+            _load_times[name] = time.perf_counter() - started
+            logger.info('Loaded %s model in %.2fs', name, _load_times[name])
+    return _models[name]
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def load_times():
+    """
+    Seconds spent loading each model that has been loaded so far
+    """
+    return dict(_load_times)
+
+
+def warm_up(names=None):
+    """
+    Load the given models (all by default) and return their load times
+    """
+    names = list(names or LOADERS)
+    for name in names:
+        get_model(name)
+    times = load_times()
+    return {name: times[name] for name in names}
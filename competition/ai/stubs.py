@@ -0,0 +1,60 @@
+"""
+Deterministic stand-ins for the NLP models.
+
+Used by benchmarks and offline runs (``NLP_STUB_MODELS = True``): they are
+fast, need no downloads and always give the same answer for the same text.
+"""
+import hashlib
+import re
+
+import numpy as np
+
+STUB_EMBEDDING_MODEL_NAME = 'stub-hashed-bag-of-words'
+
+WORD_RE = re.compile(r"[A-Za-z']+")
+
+# Common misspellings flagged as spelling issues; everything else is clean
+MISSPELLINGS = {'teh', 'recieve', 'definately', 'seperate', 'occured', 'untill', 'wich', 'becuase'}
+
+
+class StubMatch:
+    def __init__(self, rule_issue_type):
+        self.rule_issue_type = rule_issue_type
+
+
+class StubGrammarTool:
+    """
+    Mimics ``LanguageTool.check``: known misspellings are spelling issues,
+    a repeated word ("the the") is a grammar issue.
+    """
+
+    def check(self, text):
+        words = [w.lower() for w in WORD_RE.findall(text)]
+        matches = [StubMatch('misspelling') for w in words if w in MISSPELLINGS]
+        matches += [StubMatch('grammar') for a, b in zip(words, words[1:]) if a == b]
+        return matches
+
+
+class StubEncoder:
+    """
+    Mimics ``SentenceTransformer.encode`` with a hashed bag of words
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _embed(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in WORD_RE.findall(text.lower()):
+            digest = hashlib.md5(word.encode('utf-8')).digest()
+            vec[int.from_bytes(digest[:4], 'little') % self.dim] += 1.0
+        return vec
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vecs = np.stack([self._embed(text) for text in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+            vecs = vecs / np.where(norms == 0, 1, norms)
+        return vecs[0] if single else vecs
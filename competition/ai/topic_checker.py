@@ -1,9 +1,57 @@
-from sentence_transformers import SentenceTransformer, util
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from competition.metrics import track_nlp
+
+from .embedding_cache import cached_encode
+from .registry import embedding_model_name, get_model
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
 
 def get_topic_score(topic, text):
-    topic_vec = model.encode(topic, convert_to_tensor=True)
-    essay_vec = model.encode(text, convert_to_tensor=True)
+    return float(get_topic_scores(topic, [text])[0])
+
+
+def get_topic_embedding(topic):
+    """
+    Normalized topic embedding. Keyed by the topic text itself, so editing
+    a competition title naturally misses the cache.
+    """
+    return _topic_embedding(embedding_model_name(), topic)
+
+
+@lru_cache(maxsize=256)
+def _topic_embedding(model_name, topic):
+    return encode_texts([topic])[0]
+
+
+def encode_texts(texts, batch_size=None):
+    """
+    Normalized float32 embeddings for many texts, encoded in batches.
+    Texts already in the embedding store are not re-encoded.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'TOPIC_BATCH_SIZE', 32)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    def encode(batch):
+        with track_nlp():
+            return get_model('embedding').encode(
+                batch,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+
+    return cached_encode(embedding_model_name(), list(texts), encode)
+
 
-    return float(util.cos_sim(topic_vec, essay_vec))
+def get_topic_scores(topic, texts, batch_size=None):
+    """
+    Cosine similarity of each text to the topic, as a float array
+    """
+    if not texts:
+        return np.zeros(0, dtype=np.float32)
+    return encode_texts(texts, batch_size) @ get_topic_embedding(topic)
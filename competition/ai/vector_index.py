@@ -0,0 +1,329 @@
+"""
+Per-competition index of essay embeddings for "more like this" queries.
+
+Each competition has one append-only file ``VECTOR_INDEX_DIR/<model>/<id>.vec``:
+the dimension (int64) followed by one record per finished essay, its int64
+id and normalized float32 vector. The records are memory-mapped, so a
+query is a single matrix-vector product and never re-encodes text.
+Scoring appends each essay as it completes; ``manage.py
+rebuild_vector_index`` rewrites (and compacts) the file with one rename.
+Appends and rewrites take the same lock on ``<id>.lock``, a file that is
+never replaced.
+
+Above ``VECTOR_APPROXIMATE_MIN_ROWS`` rows, queries first shortlist
+candidates by the Hamming distance of random-hyperplane sign codes, then
+rank only those exactly.
+"""
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .registry import embedding_model_name
+from .topic_checker import encode_texts
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX; writes are then only serialised per process
+    fcntl = None
+
+HEADER_BYTES = 8
+CODE_BITS = 256
+# Candidates re-ranked exactly per requested result in approximate mode
+SHORTLIST_FACTOR = 20
+SEED = 20261017
+
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def index_dir(model_name=None):
+    root = Path(getattr(settings, 'VECTOR_INDEX_DIR', Path(settings.BASE_DIR) / 'vector_index'))
+    slug = re.sub(r'[^\w.-]+', '_', model_name or embedding_model_name())
+    return root / slug
+
+
+def approximate_min_rows():
+    return getattr(settings, 'VECTOR_APPROXIMATE_MIN_ROWS', 20000)
+
+
+def paraphrase_threshold():
+    return getattr(settings, 'VECTOR_PARAPHRASE_THRESHOLD', 0.9)
+
+
+def record_dtype(dim):
+    return np.dtype([('id', '<i8'), ('vector', '<f4', (dim,))])
+
+
+class VectorIndex:
+    """
+    Append-only embedding records of one competition
+    """
+
+    def __init__(self, directory, competition_id):
+        self.path = Path(directory) / f'{competition_id}.vec'
+        self.lock_path = Path(directory) / f'{competition_id}.lock'
+        self._lock = threading.Lock()
+        self._loaded_state = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._live = None
+        self._codes = None
+
+    @contextmanager
+    def _locked(self):
+        """
+        Exclusive access for writers, across threads and (with fcntl)
+        processes. The data file is opened only once the lock is held, so
+        an append never lands in a file a rewrite has just replaced.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.lock_path, 'ab') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    def size(self):
+        """
+        Number of records in the file, superseded ones included
+        """
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        if size <= HEADER_BYTES:
+            return 0
+        dim = int(np.fromfile(self.path, dtype=np.int64, count=1)[0])
+        return (size - HEADER_BYTES) // record_dtype(dim).itemsize
+
+    def mark(self):
+        """
+        Position to pass to ``replace(since=...)``: the current file and
+        its record count
+        """
+        try:
+            inode = self.path.stat().st_ino
+        except FileNotFoundError:
+            inode = None
+        return inode, self.size()
+
+    def append(self, essay_id, vector):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        record = np.zeros(1, dtype=record_dtype(len(vector)))
+        record['id'], record['vector'] = essay_id, vector
+        with self._locked(), open(self.path, 'ab') as handle:
+            if handle.tell() == 0:
+                handle.write(np.int64(len(vector)).tobytes())
+            # one write: readers only map whole records
+            handle.write(record.tobytes())
+
+    def replace(self, essay_ids, matrix, since=None):
+        """
+        Atomically replace the whole index. Records appended since
+        ``since`` (a ``mark()`` taken before the new rows were computed)
+        are carried over, so essays scored during a rebuild are kept.
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        ids = np.asarray(essay_ids, dtype=np.int64)
+        with self._locked():
+            carried = self._appended_since(*since) if since is not None else None
+            dim = matrix.shape[1] if matrix.ndim == 2 and len(ids) else None
+            if dim is None and carried is not None:
+                dim = carried.dtype['vector'].shape[0]
+            records = np.zeros(len(ids), dtype=record_dtype(dim or 0))
+            records['id'] = ids
+            if len(ids):
+                records['vector'] = matrix
+            if carried is not None and carried.dtype == records.dtype:
+                records = np.concatenate([records, carried])
+
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(np.int64(dim or 0).tobytes())
+                handle.write(records.tobytes())
+            os.replace(tmp, self.path)
+            self._loaded_state = None
+
+    def _appended_since(self, inode, start):
+        if inode is None:
+            start = 0  # the file was created after the mark
+        elif not self.path.exists() or self.path.stat().st_ino != inode:
+            return None  # rewritten meanwhile
+        rows = self.size()
+        if rows <= start:
+            return None
+        dim = int(np.fromfile(self.path, dtype=np.int64, count=1)[0])
+        dtype = record_dtype(dim)
+        return np.fromfile(self.path, dtype=dtype, count=rows - start, offset=HEADER_BYTES + start * dtype.itemsize)
+
+    def _load(self):
+        """
+        (ids, matrix, live) for the current file, re-mapped only when it
+        changes. ``live`` masks out rows superseded by a later row of the
+        same essay (None when there are none).
+        """
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self):
+        try:
+            stat = self.path.stat()
+            state = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            state = (0, 0, 0)
+        if state == self._loaded_state:
+            return self._ids, self._matrix, self._live
+
+        rows = self.size()
+        live = None
+        if rows == 0:
+            ids, matrix = np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+        else:
+            dim = int(np.fromfile(self.path, dtype=np.int64, count=1)[0])
+            records = np.memmap(self.path, dtype=record_dtype(dim), mode='r', offset=HEADER_BYTES, shape=(rows,))
+            ids = np.array(records['id'])
+            # a strided view of the mapping; nothing is copied into memory
+            matrix = records['vector']
+            # a re-scored essay is appended again; its last row wins
+            _, last_reversed = np.unique(ids[::-1], return_index=True)
+            if len(last_reversed) < rows:
+                live = np.zeros(rows, dtype=bool)
+                live[rows - 1 - last_reversed] = True
+
+        codes = self._codes
+        appended = (
+            codes is not None and self._loaded_state is not None and state[0] == self._loaded_state[0]
+            and len(codes) <= len(ids) and np.array_equal(ids[:len(codes)], self._ids[:len(codes)])
+        )
+        # sign codes of rows already seen are kept; only new rows are coded
+        self._codes = np.concatenate([codes, sign_codes(matrix[len(codes):])]) if appended else None
+        self._ids, self._matrix, self._live = ids, matrix, live
+        self._loaded_state = state
+        return ids, matrix, live
+
+    def _sign_codes(self, matrix):
+        if self._codes is None:
+            self._codes = sign_codes(matrix)
+        return self._codes
+
+    def __len__(self):
+        ids, _, live = self._load()
+        return len(ids) if live is None else int(live.sum())
+
+    def vector(self, essay_id):
+        ids, matrix, _ = self._load()
+        rows = np.flatnonzero(ids == essay_id)
+        return np.array(matrix[rows[-1]]) if len(rows) else None
+
+    def search(self, vector, k=10, exclude=None, approximate=None):
+        """
+        [(essay_id, cosine similarity)] of the ``k`` nearest rows
+        """
+        ids, matrix, live = self._load()
+        count = len(ids) if live is None else int(live.sum())
+        if not count:
+            return []
+        if approximate is None:
+            approximate = count >= approximate_min_rows()
+
+        wanted = k + (1 if exclude is not None else 0)
+        if approximate and count > wanted * SHORTLIST_FACTOR:
+            codes = self._sign_codes(matrix)
+            distance = POPCOUNT[codes ^ sign_codes(vector[None, :])].sum(axis=1, dtype=np.uint32)
+            if live is not None:
+                distance[~live] = np.iinfo(np.uint32).max
+            rows = np.argpartition(distance, wanted * SHORTLIST_FACTOR)[:wanted * SHORTLIST_FACTOR]
+            rows.sort()
+            scores = matrix[rows] @ vector
+        else:
+            rows = np.arange(len(ids))
+            scores = matrix @ vector
+        if live is not None:
+            scores[~live[rows]] = -np.inf
+
+        top = np.argsort(-scores, kind='stable')[:wanted]
+        results = [
+            (int(ids[rows[i]]), float(scores[i])) for i in top
+            if ids[rows[i]] != exclude and np.isfinite(scores[i])
+        ]
+        return results[:k]
+
+
+def sign_codes(matrix):
+    """
+    Packed sign bits of ``matrix`` projected on fixed random hyperplanes
+    """
+    planes = _hyperplanes(matrix.shape[1])
+    return np.packbits(np.asarray(matrix, dtype=np.float32) @ planes > 0, axis=1)
+
+
+_planes = {}
+
+
+def _hyperplanes(dim):
+    if dim not in _planes:
+        rng = np.random.default_rng(SEED)
+        _planes[dim] = rng.standard_normal((dim, CODE_BITS)).astype(np.float32)
+    return _planes[dim]
+
+
+def get_index(competition_id, model_name=None):
+    directory = index_dir(model_name)
+    key = (str(directory), competition_id)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = VectorIndex(directory, competition_id)
+        return _indexes[key]
+
+
+def add_essay(essay):
+    """
+    Append a finished essay. Its embedding normally comes from the
+    embedding store, filled when the topic score was computed.
+    """
+    text = essay.full_text()
+    if not text.strip():
+        return
+    get_index(essay.competition_id).append(essay.pk, encode_texts([text])[0])
+
+
+def rebuild(competition):
+    """
+    Rewrite a competition's index from its finished essays. Returns the
+    number of rows written.
+    """
+    from competition.models import Essay
+
+    index = get_index(competition.pk)
+    # essays the scoring worker appends from here on are kept by replace()
+    since = index.mark()
+    essays = [
+        essay for essay in
+        Essay.objects
+        .filter(competition=competition, status__in=['completed', 'locked'])
+        .prefetch_related('paragraphs')
+        .order_by('pk')
+        if essay.full_text().strip()
+    ]
+    vectors = encode_texts([essay.full_text() for essay in essays])
+    index.replace([essay.pk for essay in essays], vectors, since=since)
+    return len(essays)
+
+
+def similar_essays(essay, k=10):
+    """
+    Essays of the same competition closest in meaning to ``essay``:
+    [(essay_id, similarity)], most similar first.
+    """
+    index = get_index(essay.competition_id)
+    vector = index.vector(essay.pk)
+    if vector is None:
+        return []
+    return index.search(vector, k=k, exclude=essay.pk)
@@ -9,4 +9,10 @@ class CompetitionConfig(AppConfig):
         """
         Import signals when app is ready
         """
-        import competition.signals
\ No newline at end of file
+        import competition.signals
+
+        # Optional warm-up so the first scored essay doesn't pay the model load
+        from django.conf import settings
+        if getattr(settings, 'NLP_WARM_ON_STARTUP', False):
+            from .ai.registry import warm_up
+            warm_up()
\ No newline at end of file
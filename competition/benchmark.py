@@ -0,0 +1,230 @@
+"""
+Benchmarks of the hot paths.
+
+Each benchmark drives the real views through the test client (or calls the
+scoring code directly) and records latency percentiles and query counts.
+Results are plain dicts so they can be written as JSON and compared
+between commits.
+"""
+import random
+import statistics
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .jobs import score_essay
+from .leaderboard import rebuild_leaderboard
+from .metrics import collect_metrics
+from .models import Competition, Essay
+from .synthetic import paragraph_text
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(timings, queries):
+    ordered = sorted(timings)
+    return {
+        'n': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'queries': max(queries),
+    }
+
+
+def measure(func, repeat):
+    timings, queries = [], []
+    for i in range(repeat):
+        with collect_metrics() as metrics:
+            func(i)
+        timings.append(metrics.total_time)
+        queries.append(metrics.queries)
+    return summarize(timings, queries)
+
+
+def logged_in_client(user):
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(user)
+    return client
+
+
+def bench_essay_write(repeat):
+    """
+    POST one paragraph per iteration into an active competition
+    """
+    now = timezone.now()
+    competition = Competition.objects.filter(start_date__lte=now, end_date__gte=now).first()
+    if competition is None:
+        return None
+    writers = list(
+        User.objects.filter(profile__status='verified')
+        .exclude(essays__competition=competition)[:repeat]
+    )
+    if not writers:
+        return None
+    url = reverse('essay_write', args=[competition.pk])
+    clients = [logged_in_client(user) for user in writers]
+    text = paragraph_text(random.Random(0))
+
+    def submit(i):
+        clients[i % len(clients)].post(url, {'content': text})
+
+    return measure(submit, len(clients))
+
+
+def deadline_burst(competition, concurrency=32):
+    """
+    Every user with an in-progress essay in ``competition`` submits their
+    last paragraph at once, from ``concurrency`` threads with a database
+    connection each, as in a threaded server at a deadline. Reports
+    latency percentiles, the error rate and throughput.
+    """
+    writers = list(User.objects.filter(essays__competition=competition, essays__status='in_progress'))
+    if not writers:
+        return None
+    clients = []
+    for user in writers:
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        clients.append(client)
+    url = reverse('essay_write', args=[competition.pk])
+    text = paragraph_text(random.Random(0))
+
+    def submit(client):
+        started = time.perf_counter()
+        error = None
+        try:
+            response = client.post(url, {'content': text})
+            if response.status_code != 302 or response.url in (url, reverse('competition_list')):
+                error = f'HTTP {response.status_code}'
+        except Exception as exc:
+            error = type(exc).__name__
+        finally:
+            # connections are per thread; close like a server at request end
+            connections.close_all()
+        return time.perf_counter() - started, error
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(submit, clients))
+    elapsed = time.perf_counter() - started
+
+    timings = sorted(timing for timing, _ in results)
+    errors = Counter(error for _, error in results if error)
+    return {
+        'n': len(results),
+        'concurrency': concurrency,
+        'p50_ms': round(timings[len(timings) // 2] * 1000, 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+        'error_rate': round(sum(errors.values()) / len(results), 4),
+        'errors': dict(errors),
+        'requests_per_second': round(len(results) / elapsed, 2) if elapsed else None,
+        'completed': Essay.objects.filter(competition=competition, status='completed').count(),
+    }
+
+
+def bench_get(client, url, repeat):
+    return measure(lambda i: client.get(url), repeat)
+
+
+def bench_scoring(limit):
+    """
+    Essays scored per second by the background scoring code
+    """
+    essays = list(
+        Essay.objects.filter(status='completed')
+        .select_related('competition')
+        .prefetch_related('paragraphs')[:limit]
+    )
+    if not essays:
+        return None
+    started = time.perf_counter()
+    for essay in essays:
+        score_essay(essay)
+    elapsed = time.perf_counter() - started
+    return {
+        'n': len(essays),
+        'total_ms': round(elapsed * 1000, 3),
+        'per_essay_ms': round(elapsed / len(essays) * 1000, 3),
+        'essays_per_second': round(len(essays) / elapsed, 2) if elapsed else None,
+    }
+
+
+def run(admin, repeat=10, scoring_limit=200):
+    """
+    Run every benchmark against the current database as the superuser
+    ``admin``
+    """
+    results = {}
+    admin_client = logged_in_client(admin)
+
+    results['scoring'] = bench_scoring(scoring_limit)
+
+    ended = (
+        Competition.objects
+        .filter(end_date__lt=timezone.now(), essays__status='completed')
+        .distinct()
+        .first()
+    )
+    if ended is not None:
+        viewer = ended.essays.select_related('user').first().user
+        started = time.perf_counter()
+        rebuild_leaderboard(ended)
+        results['leaderboard_rebuild'] = {'total_ms': round((time.perf_counter() - started) * 1000, 3)}
+        results['leaderboard'] = bench_get(
+            logged_in_client(viewer), reverse('leaderboard', args=[ended.pk]), repeat,
+        )
+
+    results['essay_write'] = bench_essay_write(repeat)
+    results['custom_admin_dashboard'] = bench_get(admin_client, reverse('custom_admin:dashboard'), repeat)
+    results['custom_admin_essays'] = bench_get(admin_client, reverse('custom_admin:essays'), repeat)
+    results['custom_admin_essay_search'] = bench_get(
+        admin_client, reverse('custom_admin:essay_search') + '?q=climate', repeat,
+    )
+
+    essay = Essay.objects.order_by('-paragraph_count').first()
+    if essay is not None:
+        results['essay_detail'] = bench_get(
+            admin_client, reverse('custom_admin:essay_detail', args=[essay.pk]), repeat,
+        )
+
+    # scoring above appended the scored essays to their competition's vector index
+    scored = Essay.objects.filter(status='completed').order_by('pk').first()
+    if scored is not None:
+        results['essay_similar'] = bench_get(
+            admin_client, reverse('custom_admin:essay_similar', args=[scored.pk]), repeat,
+        )
+
+    return {k: v for k, v in results.items() if v is not None}
+
+
+def compare(previous, current):
+    """
+    Lines describing how each timing changed versus a previous result file
+    """
+    lines = []
+    for name, stats in current.items():
+        before = previous.get(name)
+        if not before:
+            continue
+        for key in ('p50_ms', 'total_ms', 'per_essay_ms'):
+            if key in stats and key in before and before[key]:
+                change = (stats[key] - before[key]) / before[key] * 100
+                lines.append(f'{name}.{key}: {before[key]} -> {stats[key]} ({change:+.1f}%)')
+    return lines
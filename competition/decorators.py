@@ -2,6 +2,8 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from functools import wraps
 
+from .verification import get_status
+
 
 def verified_user_required(view_func):
     """
@@ -13,11 +15,12 @@ def verified_user_required(view_func):
             messages.error(request, 'You must be logged in to access this page.')
             return redirect('login')
         
-        if not hasattr(request.user, 'profile'):
+        status = get_status(request.user)
+        if status is None:
             messages.error(request, 'Your profile is not set up. Please contact admin.')
             return redirect('dashboard')
         
-        if request.user.profile.status != 'verified':
+        if status != 'verified':
             messages.error(request, 'Your account is not verified. Please wait for admin approval.')
             return redirect('dashboard')
         
@@ -0,0 +1,260 @@
+"""
+Near-duplicate essay detection with MinHash and locality-sensitive hashing.
+
+Each finished essay is reduced to the set of its word shingles (runs of
+``DUPLICATE_SHINGLE_SIZE`` words) and summarised by a MinHash signature of
+``DUPLICATE_NUM_PERM`` values, whose agreement rate estimates the Jaccard
+similarity of two shingle sets. The signature is cut into
+``DUPLICATE_LSH_BANDS`` bands; each band is hashed to a bucket stored in
+``SignatureBand``, so essays sharing a bucket are found with an indexed
+lookup instead of comparing every pair. Candidates are then checked
+against ``DUPLICATE_THRESHOLD`` using the full signatures.
+
+With b bands of r rows, a pair of similarity s becomes a candidate with
+probability 1 - (1 - s^r)^b; the defaults (32 x 4) put the midpoint of
+that curve near 0.42.
+"""
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from .models import Essay, EssaySignature, SignatureBand
+
+# Mersenne prime for the universal hash family; a * x stays below 2**62
+PRIME = (1 << 31) - 1
+SEED = 20261017
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def shingle_size():
+    return getattr(settings, 'DUPLICATE_SHINGLE_SIZE', 5)
+
+
+def num_perm():
+    return getattr(settings, 'DUPLICATE_NUM_PERM', 128)
+
+
+def band_count():
+    bands = getattr(settings, 'DUPLICATE_LSH_BANDS', 32)
+    if num_perm() % bands:
+        raise ImproperlyConfigured('DUPLICATE_LSH_BANDS must divide DUPLICATE_NUM_PERM')
+    return bands
+
+
+def default_threshold():
+    return getattr(settings, 'DUPLICATE_THRESHOLD', 0.5)
+
+
+def current_params():
+    """
+    Signature parameters; rows computed with other values are ignored
+    """
+    return {'shingle_size': shingle_size(), 'num_perm': num_perm(), 'bands': band_count()}
+
+
+def shingles(text, size=None):
+    size = size or shingle_size()
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+@lru_cache(maxsize=4)
+def _permutations(n):
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(1, PRIME, size=n, dtype=np.uint64)
+    b = rng.integers(0, PRIME, size=n, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def minhash(shingle_set, n=None):
+    """
+    uint32 signature of ``n`` MinHash values for a non-empty shingle set
+    """
+    n = n or num_perm()
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode()) for s in shingle_set), dtype=np.uint64, count=len(shingle_set),
+    ) % PRIME
+    a, b = _permutations(n)
+    return ((a * hashes + b) % PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature, bands=None):
+    """
+    One signed 64-bit bucket per band; the band number is part of the hash
+    so equal rows in different bands don't collide.
+    """
+    bands = bands or band_count()
+    buckets = []
+    for band, rows in enumerate(np.split(signature, bands)):
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8, key=band.to_bytes(2, 'little')).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+def estimate(signature_a, signature_b):
+    """
+    Estimated Jaccard similarity of two signatures
+    """
+    return float(np.count_nonzero(signature_a == signature_b)) / len(signature_a)
+
+
+def jaccard(set_a, set_b):
+    if not set_a or not set_b:
+        return 0.0
+    return len(set_a & set_b) / len(set_a | set_b)
+
+
+def load(signature):
+    return np.frombuffer(bytes(signature.minhash), dtype=np.uint32)
+
+
+def index_essay(essay):
+    """
+    Compute and store the signature and band buckets of ``essay``.
+    An essay without words gets an empty signature and no buckets, so it
+    counts as indexed but never matches. Returns the ``EssaySignature``.
+    """
+    shingle_set = shingles(essay.full_text())
+    params = current_params()
+    values = minhash(shingle_set, params['num_perm']) if shingle_set else np.empty(0, dtype=np.uint32)
+    with transaction.atomic():
+        signature, _ = EssaySignature.objects.update_or_create(
+            essay=essay,
+            defaults={
+                'competition_id': essay.competition_id,
+                'shingle_count': len(shingle_set),
+                'minhash': values.tobytes(),
+                **params,
+            },
+        )
+        signature.band_rows.all().delete()
+        if shingle_set:
+            SignatureBand.objects.bulk_create(
+                SignatureBand(signature=signature, competition_id=essay.competition_id, bucket=bucket)
+                for bucket in band_buckets(values, params['bands'])
+            )
+    return signature
+
+
+def find_similar(essay, threshold=None):
+    """
+    Other essays of the same competition that look copied from or into
+    ``essay``: [(EssaySignature, similarity)], most similar first.
+    """
+    threshold = default_threshold() if threshold is None else threshold
+    signature = EssaySignature.objects.filter(essay=essay, **current_params()).first()
+    if signature is None or not signature.shingle_count:
+        return []
+
+    mine = load(signature)
+    candidate_ids = (
+        SignatureBand.objects
+        .filter(competition_id=signature.competition_id, bucket__in=band_buckets(mine, signature.bands))
+        .exclude(signature=signature)
+        .values('signature_id')
+    )
+    candidates = (
+        EssaySignature.objects
+        .filter(pk__in=candidate_ids, **current_params())
+        .select_related('essay__user')
+    )
+    matches = [(other, estimate(mine, load(other))) for other in candidates]
+    matches = [(other, similarity) for other, similarity in matches if similarity >= threshold]
+    matches.sort(key=lambda match: (-match[1], match[0].essay_id))
+    return matches
+
+
+def candidate_pairs(competition):
+    """
+    Signature id pairs sharing at least one LSH bucket
+    """
+    buckets = defaultdict(list)
+    rows = (
+        SignatureBand.objects
+        .filter(competition=competition, signature__num_perm=num_perm(),
+                signature__shingle_size=shingle_size(), signature__bands=band_count())
+        .values_list('bucket', 'signature_id')
+        .iterator(chunk_size=5000)
+    )
+    for bucket, signature_id in rows:
+        buckets[bucket].append(signature_id)
+
+    pairs = set()
+    for ids in buckets.values():
+        if len(ids) > 1:
+            ids.sort()
+            pairs.update((a, b) for i, a in enumerate(ids) for b in ids[i + 1:])
+    return pairs
+
+
+def duplicate_pairs(competition, threshold=None):
+    """
+    [(essay_a, essay_b, similarity)] for every likely-copied pair in a
+    competition, most similar first.
+    """
+    threshold = default_threshold() if threshold is None else threshold
+    pairs = candidate_pairs(competition)
+    if not pairs:
+        return []
+
+    ids = {signature_id for pair in pairs for signature_id in pair}
+    signatures = EssaySignature.objects.select_related('essay__user').in_bulk(ids)
+    vectors = {pk: load(signature) for pk, signature in signatures.items()}
+
+    found = []
+    for a, b in pairs:
+        similarity = estimate(vectors[a], vectors[b])
+        if similarity >= threshold:
+            essay_a, essay_b = sorted([signatures[a].essay, signatures[b].essay], key=lambda e: e.pk)
+            found.append((essay_a, essay_b, similarity))
+    found.sort(key=lambda pair: (-pair[2], pair[0].pk, pair[1].pk))
+    return found
+
+
+def matching_paragraphs(essay_a, essay_b, threshold=None):
+    """
+    Paragraph pairs of two essays with exact shingle Jaccard at or above
+    the threshold: [(order_a, order_b, similarity)]. Only used for pairs
+    already flagged, so the direct comparison is cheap.
+    """
+    threshold = default_threshold() if threshold is None else threshold
+    shingled_b = [(p.order, shingles(p.content)) for p in essay_b.paragraphs.all()]
+    found = []
+    for paragraph in essay_a.paragraphs.all():
+        shingled_a = shingles(paragraph.content)
+        for order_b, shingled in shingled_b:
+            similarity = jaccard(shingled_a, shingled)
+            if similarity >= threshold:
+                found.append((paragraph.order, order_b, similarity))
+    return found
+
+
+def index_missing(competition=None):
+    """
+    Index finished essays that have no signature with the current
+    parameters. Returns the number indexed.
+    """
+    essays = (
+        Essay.objects
+        .filter(status__in=['completed', 'locked'])
+        .exclude(signature__in=EssaySignature.objects.filter(**current_params()))
+        .prefetch_related('paragraphs')
+    )
+    if competition is not None:
+        essays = essays.filter(competition=competition)
+
+    count = 0
+    for essay in essays.iterator(chunk_size=200):
+        index_essay(essay)
+        count += 1
+    return count
@@ -0,0 +1,166 @@
+"""
+Streaming export of essays and their results as CSV or JSON Lines.
+
+Rows are read with ``values_list().iterator(chunk_size=...)`` and turned
+into text one chunk at a time, so memory use does not grow with the number
+of essays and the first bytes go out after the first chunk. Paragraph
+text, when requested, is fetched with one query per chunk. ``gzip`` output
+is compressed on the fly.
+"""
+import csv
+import json
+import zlib
+
+from .models import Essay, Paragraph
+from .scoring import ENTRY_FIELDS, profiles
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+# (output name, Essay lookup) in output order
+COLUMNS = [
+    ('essay_id', 'pk'),
+    ('competition_id', 'competition_id'),
+    ('competition', 'competition__title'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('status', 'status'),
+    ('started_at', 'started_at'),
+    ('completed_at', 'completed_at'),
+    ('paragraphs', 'paragraph_count'),
+    ('words', 'word_count'),
+    ('grammar_errors', 'grammar_errors'),
+    ('spelling_errors', 'spelling_errors'),
+    ('topic_similarity', 'topic_similarity'),
+    ('rank', 'leaderboard_entry__rank'),
+    ('final_score', 'leaderboard_entry__final_score'),
+    ('score_version', 'leaderboard_entry__score_version'),
+]
+BREAKDOWN = 'leaderboard_entry__breakdown'
+
+
+def component_names():
+    """
+    Every component of the configured profiles, built-ins first
+    """
+    names = list(ENTRY_FIELDS)
+    for config in profiles().values():
+        names += [name for name in config['weights'] if name not in names]
+    return names
+
+
+def essays_queryset(competition_ids=None, statuses=None):
+    essays = Essay.objects.all()
+    if competition_ids:
+        essays = essays.filter(competition__in=competition_ids)
+    if statuses:
+        essays = essays.filter(status__in=statuses)
+    return essays
+
+
+def filename(fmt, compress=False):
+    return f'essays.{fmt}' + ('.gz' if compress else '')
+
+
+def content_type(fmt, compress=False):
+    return 'application/gzip' if compress else CONTENT_TYPES[fmt]
+
+
+def records(essays, include_text=False, chunk_size=2000):
+    """
+    Yield lists of up to ``chunk_size`` export records (dicts) for
+    ``essays``, in primary-key order
+    """
+    names = [name for name, _ in COLUMNS]
+    rows = (
+        essays.order_by('pk')
+        .values_list(*[lookup for _, lookup in COLUMNS], BREAKDOWN)
+        .iterator(chunk_size=chunk_size)
+    )
+    chunk = []
+    for row in rows:
+        record = dict(zip(names, row))
+        record['components'] = row[-1] or {}
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield with_text(chunk) if include_text else chunk
+            chunk = []
+    if chunk:
+        yield with_text(chunk) if include_text else chunk
+
+
+def with_text(chunk):
+    texts = {record['essay_id']: [] for record in chunk}
+    paragraphs = (
+        Paragraph.objects
+        .filter(essay_id__in=list(texts))
+        .order_by('essay_id', 'order')
+        .values_list('essay_id', 'content')
+    )
+    for essay_id, content in paragraphs:
+        texts[essay_id].append(content)
+    for record in chunk:
+        record['text'] = '\n\n'.join(texts[record['essay_id']])
+    return chunk
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+class Echo:
+    """
+    File-like object whose ``write`` returns the text, for csv.writer
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(chunks, include_text=False):
+    components = component_names()
+    header = [name for name, _ in COLUMNS] + [f'score_{name}' for name in components]
+    if include_text:
+        header.append('text')
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for chunk in chunks:
+        lines = []
+        for record in chunk:
+            row = [
+                isoformat(record[name]) if name in ('started_at', 'completed_at') else record[name]
+                for name, _ in COLUMNS
+            ]
+            row += [record['components'].get(name) for name in components]
+            if include_text:
+                row.append(record['text'])
+            lines.append(writer.writerow(row))
+        yield ''.join(lines)
+
+
+def jsonl_lines(chunks):
+    for chunk in chunks:
+        lines = []
+        for record in chunk:
+            record['started_at'] = isoformat(record['started_at'])
+            record['completed_at'] = isoformat(record['completed_at'])
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        yield ''.join(lines)
+
+
+def gzipped(pieces):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for piece in pieces:
+        # a sync flush per chunk sends it now instead of when zlib's buffer fills
+        yield compressor.compress(piece.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def stream(essays, fmt='csv', include_text=False, compress=False, chunk_size=2000):
+    """
+    Export ``essays`` as an iterator of str pieces, or of gzip bytes with
+    ``compress``
+    """
+    chunks = records(essays, include_text, chunk_size)
+    pieces = csv_lines(chunks, include_text) if fmt == 'csv' else jsonl_lines(chunks)
+    return gzipped(pieces) if compress else pieces
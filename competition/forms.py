@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from .models import Competition, Paragraph, UserProfile
+from .scoring import profile_choices
 
 
 class ParagraphForm(forms.ModelForm):
@@ -37,7 +38,7 @@ class CompetitionForm(forms.ModelForm):
     """
     class Meta:
         model = Competition
-        fields = ['title', 'description', 'start_date', 'end_date', 'max_paragraphs']
+        fields = ['title', 'description', 'start_date', 'end_date', 'max_paragraphs', 'scoring_profile']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
@@ -45,6 +46,15 @@ class CompetitionForm(forms.ModelForm):
             'end_date': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
             'max_paragraphs': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['scoring_profile'] = forms.ChoiceField(
+            choices=profile_choices(),
+            initial='default',
+            widget=forms.Select(attrs={'class': 'form-control'}),
+            help_text='Weights used to combine the judge scores.',
+        )
     
     def clean(self):
         cleaned_data = super().clean()
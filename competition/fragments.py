@@ -0,0 +1,151 @@
+"""
+Cached page fragments with versioned invalidation.
+
+Every cached fragment key includes the version of its *scope*:
+``competitions`` for the competition list and ``competition:<id>`` for one
+competition's leaderboard. Bumping a scope's version (see
+``competition.signals``) orphans all of its fragments at once without
+having to know their keys; orphans simply expire after
+``FRAGMENT_CACHE_TTL`` seconds.
+
+Only shared markup is cached. Per-user pieces (the user's own essay status
+and leaderboard row) are rendered on each request, so a finished
+competition's leaderboard is served without touching the ranking tables.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.loader import get_template
+
+from .leaderboard import get_leaderboard
+from .models import Competition
+from .scoring import get_profile
+
+LIST_SCOPE = 'competitions'
+PODIUM_SIZE = 3
+
+
+def fragment_ttl():
+    return getattr(settings, 'FRAGMENT_CACHE_TTL', 3600)
+
+
+def shared():
+    """
+    Whether fragments cached here are seen by other processes; with a
+    process-local cache, rendering them ahead of time only fills this
+    process's own copy
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def version_key(scope):
+    return f'competition:fragments:version:{scope}'
+
+
+def competition_scope(competition_id):
+    return f'competition:{competition_id}'
+
+
+def get_version(scope):
+    """
+    Current version of ``scope``, started from the clock so a version lost
+    from the cache never reuses the number of an older fragment
+    """
+    key = version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key, time.time_ns() // 1000)
+    return version
+
+
+def bump(scope):
+    try:
+        cache.incr(version_key(scope))
+    except ValueError:
+        cache.set(version_key(scope), time.time_ns() // 1000, None)
+
+
+def invalidate_competition(competition_id):
+    """
+    Drop the cached leaderboard of a competition
+    """
+    bump(competition_scope(competition_id))
+
+
+def invalidate_competition_list():
+    bump(LIST_SCOPE)
+
+
+def list_version():
+    return get_version(LIST_SCOPE)
+
+
+def competitions():
+    """
+    All competitions, as listed on the competition list page
+    """
+    key = f'competition:fragments:competitions:{list_version()}'
+    result = cache.get(key)
+    if result is None:
+        result = list(Competition.objects.all())
+        cache.set(key, result, fragment_ttl())
+    return result
+
+
+def get_competition(competition_id):
+    """
+    A competition from the cached list, or None
+    """
+    for competition in competitions():
+        if competition.pk == competition_id:
+            return competition
+    return None
+
+
+def leaderboard_key(competition, staff):
+    return 'competition:fragments:leaderboard:{}:{}:{}:{}'.format(
+        competition.pk,
+        get_version(competition_scope(competition.pk)),
+        get_profile(competition.scoring_profile).version,
+        'staff' if staff else 'public',
+    )
+
+
+def render_row(entry, mine=False, show_link=False):
+    return get_template('leaderboard_row.html').render({
+        'entry': entry,
+        'essay': entry.essay,
+        'mine': mine,
+        'show_link': show_link or mine,
+    })
+
+
+def leaderboard(competition, staff=False):
+    """
+    Shared parts of a finished competition's leaderboard:
+    {'count', 'podium': [{'username', 'final_score'}], 'rows': [html],
+    'users': {user_id: row index}}. ``staff`` viewers get view links on
+    every row. When the fragment was just built, 'entries' also holds the
+    ranked entries (never cached) so callers need not query them again.
+    """
+    key = leaderboard_key(competition, staff)
+    board = cache.get(key)
+    if board is not None:
+        return board
+
+    entries = list(get_leaderboard(competition))
+    board = {
+        'count': len(entries),
+        'podium': [
+            {'username': entry.essay.user.username, 'final_score': entry.final_score}
+            for entry in entries[:PODIUM_SIZE]
+        ],
+        'rows': [render_row(entry, show_link=staff) for entry in entries],
+        'users': {entry.essay.user_id: i for i, entry in enumerate(entries)},
+    }
+    cache.set(key, board, fragment_ttl())
+    return {**board, 'entries': entries}
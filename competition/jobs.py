@@ -0,0 +1,193 @@
+"""
+Background essay scoring.
+
+Completed essays get a ``ScoringJob`` row; ``manage.py scoring_worker``
+claims queued jobs and runs the NLP scorers outside the request cycle,
+then rebuilds the rankings of the ended competitions it scored essays for,
+once per batch of jobs.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import duplicates, scoring
+from .ai import vector_index
+from .leaderboard import rebuild_leaderboard
+from .models import Competition, Essay, Paragraph, ScoringJob
+
+logger = logging.getLogger(__name__)
+
+
+def max_attempts():
+    return getattr(settings, 'SCORING_MAX_ATTEMPTS', 3)
+
+
+def retry_delay():
+    return getattr(settings, 'SCORING_RETRY_DELAY', 30)
+
+
+def stale_after():
+    return getattr(settings, 'SCORING_STALE_AFTER', 600)
+
+
+def leaderboard_interval():
+    return getattr(settings, 'SCORING_LEADERBOARD_INTERVAL', 30)
+
+
+def requeue_stale_jobs():
+    """
+    Put back jobs left 'running' by a worker that died mid-job
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after())
+    return ScoringJob.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='queued', locked_at=None,
+    )
+
+
+def requeue_stale_paragraphs():
+    """
+    Put back grammar checks left 'running' by a worker that died mid-check
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after())
+    return Paragraph.objects.filter(
+        Q(grammar_locked_at__lt=cutoff) | Q(grammar_locked_at__isnull=True),
+        grammar_status='running',
+    ).update(grammar_status='queued', grammar_locked_at=None)
+
+
+def claim_jobs(limit):
+    """
+    Atomically claim up to ``limit`` due jobs. A job is only claimed when
+    the conditional UPDATE flips it from queued to running, so several
+    workers can poll the same table safely.
+    """
+    now = timezone.now()
+    candidates = list(
+        ScoringJob.objects
+        .filter(status='queued', available_at__lte=now)
+        .values_list('pk', flat=True)[:limit]
+    )
+    claimed = []
+    for pk in candidates:
+        if ScoringJob.objects.filter(pk=pk, status='queued').update(status='running', locked_at=now):
+            claimed.append(pk)
+    return claimed
+
+
+def claim_paragraphs(limit):
+    """
+    Atomically claim up to ``limit`` paragraphs waiting for a grammar check
+    """
+    now = timezone.now()
+    candidates = list(
+        Paragraph.objects
+        .filter(grammar_status='queued')
+        .order_by('id')
+        .values_list('pk', flat=True)[:limit]
+    )
+    return [
+        pk for pk in candidates
+        if Paragraph.objects.filter(pk=pk, grammar_status='queued').update(
+            grammar_status='running', grammar_locked_at=now,
+        )
+    ]
+
+
+def check_paragraph(paragraph_id):
+    """
+    Grammar-check one claimed paragraph. Failures are left for the essay
+    scoring job, which re-checks any paragraph that isn't done.
+    """
+    close_old_connections()
+    try:
+        paragraph = Paragraph.objects.get(pk=paragraph_id)
+        try:
+            paragraph.check_grammar()
+        except Exception as exc:
+            logger.warning('Grammar check of paragraph %s failed: %r', paragraph_id, exc)
+            Paragraph.objects.filter(pk=paragraph_id).update(grammar_status='failed')
+            return 'failed'
+        return 'done'
+    finally:
+        close_old_connections()
+
+
+def score_essay(essay):
+    """
+    Run the expensive scorers and store their results on the essay
+    """
+    essay.analyze_grammar(strict=True)
+    essay.topic_similarity = None
+    essay.get_topic_similarity()
+    with transaction.atomic():
+        essay.save(update_fields=[
+            'grammar_errors', 'spelling_errors', 'grammar_score', 'topic_similarity',
+        ])
+        # the stored raw components derive from the fields just recomputed
+        scoring.measure([essay], scoring.get_profile(essay.competition.scoring_profile), refresh=True)
+    duplicates.index_essay(essay)
+    vector_index.add_essay(essay)
+
+
+def run_job(job_id):
+    """
+    Process one claimed job, rescheduling it on failure until it runs out
+    of attempts. Returns the final job status.
+    """
+    close_old_connections()
+    try:
+        job = ScoringJob.objects.select_related('essay__competition').get(pk=job_id)
+        try:
+            score_essay(job.essay)
+        except Exception as exc:
+            job.attempts += 1
+            job.last_error = repr(exc)
+            job.locked_at = None
+            if job.attempts >= max_attempts():
+                job.status = 'failed'
+                logger.exception('Scoring essay %s failed permanently', job.essay_id)
+            else:
+                job.status = 'queued'
+                job.available_at = timezone.now() + timedelta(seconds=retry_delay() * job.attempts)
+                logger.warning('Scoring essay %s failed, retry %s: %r', job.essay_id, job.attempts, exc)
+        else:
+            job.attempts += 1
+            job.status = 'done'
+            job.last_error = ''
+            job.locked_at = None
+        job.save()
+        return job.status
+    finally:
+        close_old_connections()
+
+
+def rebuild_leaderboards(job_ids):
+    """
+    Rebuild, once each, the rankings of the ended competitions that
+    ``job_ids`` scored essays for. Returns the competitions rebuilt.
+    """
+    competitions = list(Competition.objects.filter(
+        pk__in=ScoringJob.objects.filter(pk__in=job_ids, status='done').values('essay__competition_id'),
+        end_date__lt=timezone.now(),
+    ))
+    for competition in competitions:
+        rebuild_leaderboard(competition)
+    return competitions
+
+
+def enqueue_missing(competition=None, batch_size=500):
+    """
+    Queue scoring for completed essays that never got a job
+    """
+    essays = Essay.objects.filter(
+        status__in=['completed', 'locked'], scoring_job__isnull=True, paragraph_count__gt=0,
+    )
+    if competition is not None:
+        essays = essays.filter(competition=competition)
+    jobs = [ScoringJob(essay_id=pk) for pk in essays.values_list('pk', flat=True).iterator()]
+    ScoringJob.objects.bulk_create(jobs, batch_size=batch_size, ignore_conflicts=True)
+    return len(jobs)
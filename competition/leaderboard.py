@@ -0,0 +1,207 @@
+"""
+Materialized leaderboard.
+
+Scores are computed once per change in the scoring inputs and stored as
+``LeaderboardEntry`` rows, so the leaderboard page only reads sorted rows.
+Rankings are rebuilt by the scoring worker, the scheduler and the
+``build_leaderboards``/``rescore_essays`` commands, never by a page view,
+and only include essays whose scoring job has finished.
+"""
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .ai.topic_checker import get_topic_scores
+from .models import Competition, Essay, LeaderboardEntry
+from .scoring import ENTRY_FIELDS, column_frame, combine, get_profile, load_columns, measure
+
+FINISHED_STATUSES = ['completed', 'locked']
+
+
+def ranked_essays(competition):
+    """
+    Finished essays that have been scored; essays still waiting for the
+    worker would be ranked with no grammar errors and no topic score
+    """
+    return Essay.objects.filter(
+        competition=competition,
+        status__in=FINISHED_STATUSES,
+        completed_at__isnull=False,
+        scoring_job__status='done',
+    )
+
+
+def average_completion_seconds(timings):
+    """
+    Average writing time over (started_at, completed_at) pairs
+    """
+    valid_times = [
+        (completed_at - started_at).total_seconds()
+        for started_at, completed_at in timings
+        if completed_at and started_at
+    ]
+    return sum(valid_times) / len(valid_times) if valid_times else 1  # prevent div by zero
+
+
+def is_stale(competition):
+    """
+    True when the stored ranking no longer matches its inputs: the set of
+    finished essays, the average-time denominator or the scoring profile
+    version (weights, options and component versions).
+    """
+    score_version = get_profile(competition.scoring_profile).version
+    timings = list(ranked_essays(competition).values_list('id', 'started_at', 'completed_at'))
+    avg_time_seconds = average_completion_seconds((s, c) for _, s, c in timings)
+
+    stored = list(
+        LeaderboardEntry.objects
+        .filter(competition=competition)
+        .values_list('essay_id', 'avg_time_seconds', 'score_version')
+    )
+    if not stored and not timings:
+        return False
+    if {essay_id for essay_id, _, _ in timings} != {essay_id for essay_id, _, _ in stored}:
+        return True
+    return any(
+        version != score_version or abs(avg - avg_time_seconds) > 1e-6
+        for _, avg, version in stored
+    )
+
+
+def fill_topic_similarity(essays, batch_size=None):
+    """
+    Compute the missing topic similarities of a competition's essays with
+    one batched encoder pass instead of one forward pass per essay.
+    """
+    missing = [essay for essay in essays if essay.topic_similarity is None]
+    if not missing:
+        return 0
+    topic = missing[0].competition.title
+    scores = get_topic_scores(topic, [essay.full_text() for essay in missing], batch_size)
+    for essay, score in zip(missing, scores):
+        essay.topic_similarity = float(score)
+    return len(missing)
+
+
+def fill_missing_topics(competition, columns):
+    """
+    Compute (and store) the topic similarities still missing from
+    ``columns['topic_similarity']``; the only NLP step of a rebuild.
+    """
+    missing = np.flatnonzero(np.isnan(columns['topic_similarity']))
+    if not len(missing):
+        return 0
+    essays = list(
+        Essay.objects
+        .filter(pk__in=columns['pk'][missing].tolist())
+        .select_related('competition')
+        .prefetch_related('paragraphs')
+        .order_by('pk')
+    )
+    fill_topic_similarity(essays)
+    Essay.objects.bulk_update(essays, ['topic_similarity'], batch_size=500)
+    # both sides are in pk order
+    columns['topic_similarity'][missing] = [essay.topic_similarity for essay in essays]
+    return len(essays)
+
+
+def insert_entries(competition, rows, avg_time_seconds, score_version):
+    """
+    Insert ranking rows of (essay_id, rank, final_score, breakdown,
+    *ENTRY_FIELDS scores) with executemany; building thousands of model
+    instances for bulk_create costs more than the scoring itself.
+    """
+    meta = LeaderboardEntry._meta
+    fields = ['competition', 'essay', 'rank', 'final_score', 'breakdown', *ENTRY_FIELDS.values(),
+              'avg_time_seconds', 'score_version', 'computed_at']
+    columns = ', '.join(connection.ops.quote_name(meta.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    computed_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    breakdown_field = meta.get_field('breakdown')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {connection.ops.quote_name(meta.db_table)} ({columns}) VALUES ({placeholders})',
+            [
+                (competition.pk, essay_id, rank, final_score,
+                 breakdown_field.get_db_prep_save(breakdown, connection), *component_scores,
+                 avg_time_seconds, score_version, computed_at)
+                for essay_id, rank, final_score, breakdown, *component_scores in rows
+            ],
+        )
+
+
+def rebuild_leaderboard(competition):
+    """
+    Score every finished essay of a competition and replace its ranking
+    in a single transaction. Returns the number of ranked essays.
+
+    The scoring inputs are read in one query into NumPy arrays and all
+    component and final scores are computed vectorised; only missing topic
+    similarities and plugin components touch individual essays.
+    """
+    profile = get_profile(competition.scoring_profile)
+    columns = load_columns(ranked_essays(competition))
+    pks = columns['pk']
+    avg_time_seconds = float(columns['duration'].mean()) if len(pks) else 1  # prevent div by zero
+
+    if any(c.name == 'topic' for c in profile.components):
+        fill_missing_topics(competition, columns)
+    frame = column_frame(columns, profile)
+    if any(not c.columns for c in profile.components):
+        essays = list(Essay.objects.filter(pk__in=pks.tolist()).select_related('competition').order_by('pk'))
+        frame.update(measure(essays, profile))
+
+    scores, final = combine(frame, profile, avg_time_seconds)
+    # Highest score first, earlier completion breaks ties
+    order = np.lexsort((pks, columns['completed_at'], -final))
+
+    names = list(scores)
+    breakdowns = np.round(np.column_stack([scores[name] for name in names]), 4).tolist() if names else []
+    rows = []
+    for rank, i in enumerate(order.tolist(), start=1):
+        breakdown = dict(zip(names, breakdowns[i])) if names else {}
+        rows.append((
+            int(pks[i]), rank, float(final[i]), breakdown,
+            *(breakdown.get(name, 0) for name in ENTRY_FIELDS),
+        ))
+
+    with transaction.atomic():
+        # lock the competition row so concurrent rebuilds (worker, scheduler,
+        # commands) replace the ranking one after another
+        list(Competition.objects.select_for_update().filter(pk=competition.pk).values_list('pk'))
+        LeaderboardEntry.objects.filter(competition=competition).delete()
+        insert_entries(competition, rows, avg_time_seconds, profile.version)
+        # one UPDATE copies the new final scores onto the essays
+        ranked_essays(competition).update(final_score=Subquery(
+            LeaderboardEntry.objects.filter(essay=OuterRef('pk')).values('final_score')[:1]
+        ))
+
+    from .fragments import invalidate_competition
+    invalidate_competition(competition.pk)
+    return len(rows)
+
+
+def refresh_leaderboard(competition, force=False):
+    """
+    Rebuild the ranking only if its inputs changed (or ``force`` is set).
+    Returns True when a rebuild happened.
+    """
+    if force or is_stale(competition):
+        rebuild_leaderboard(competition)
+        return True
+    return False
+
+
+def get_leaderboard(competition):
+    """
+    Pre-sorted leaderboard rows for display, as last built. Read-only:
+    essays that left the ranking since (e.g. reopened) are skipped until
+    the next rebuild.
+    """
+    return (
+        LeaderboardEntry.objects
+        .filter(competition=competition, essay__status__in=FINISHED_STATUSES)
+        .select_related('essay__user')
+        .order_by('rank')
+    )
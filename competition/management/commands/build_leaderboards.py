@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from competition.leaderboard import refresh_leaderboard
+from competition.models import Competition
+
+
+class Command(BaseCommand):
+    help = 'Precompute leaderboards of ended competitions whose scoring inputs changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--competition', type=int, help='Only rebuild this competition id')
+        parser.add_argument('--force', action='store_true', help='Rebuild even if nothing changed')
+
+    def handle(self, *args, **options):
+        competitions = Competition.objects.filter(end_date__lt=timezone.now())
+        if options['competition']:
+            competitions = Competition.objects.filter(pk=options['competition'])
+
+        for competition in competitions:
+            rebuilt = refresh_leaderboard(competition, force=options['force'])
+            state = 'rebuilt' if rebuilt else 'up to date'
+            self.stdout.write(f'{competition.title}: {state}')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Switch the SQLite database to write-ahead logging so pages keep reading while '
+        'essays are submitted, and new connections then commit with synchronous=NORMAL. '
+        'The mode is stored in the database file: run once per deployment'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Write-ahead logging only applies to SQLite databases')
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            mode = cursor.fetchone()[0]
+        if mode != 'wal':
+            raise CommandError(f'SQLite kept journal mode {mode!r}')
+        if options['verbosity']:
+            self.stdout.write(f"{connection.settings_dict['NAME']}: journal mode {mode}")
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from competition import export
+
+
+class Command(BaseCommand):
+    help = 'Stream essays and their results as CSV or JSON Lines, optionally gzipped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--competition', type=int, action='append', help='Competition id (repeatable)')
+        parser.add_argument('--status', action='append', choices=['in_progress', 'completed', 'locked'],
+                            help='Essay status (repeatable)')
+        parser.add_argument('--format', choices=export.FORMATS, default='csv')
+        parser.add_argument('--text', action='store_true', help='Include the full essay text')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Essays read per query')
+        parser.add_argument('--output', help='File to write (default: standard output)')
+
+    def handle(self, *args, **options):
+        if options['gzip'] and not options['output'] and sys.stdout.isatty():
+            raise CommandError('Refusing to write gzip data to a terminal; use --output')
+
+        essays = export.essays_queryset(options['competition'], options['status'])
+        pieces = export.stream(
+            essays, options['format'],
+            include_text=options['text'], compress=options['gzip'], chunk_size=options['chunk_size'],
+        )
+
+        if options['output']:
+            mode = 'wb' if options['gzip'] else 'w'
+            with open(options['output'], mode, **({} if options['gzip'] else {'newline': ''})) as fh:
+                for piece in pieces:
+                    fh.write(piece)
+            self.stdout.write(f"Exported to {options['output']}")
+        elif options['gzip']:
+            for piece in pieces:
+                sys.stdout.buffer.write(piece)
+            sys.stdout.buffer.flush()
+        else:
+            for piece in pieces:
+                self.stdout.write(piece, ending='')
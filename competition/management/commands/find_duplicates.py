@@ -0,0 +1,55 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from competition import duplicates
+from competition.models import Competition
+
+
+class Command(BaseCommand):
+    help = 'Report essays that look copied from another essay of the same competition'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--competition', type=int, help='Only check this competition id')
+        parser.add_argument('--threshold', type=float,
+                            help='Minimum estimated similarity (default DUPLICATE_THRESHOLD)')
+        parser.add_argument('--no-index', action='store_true',
+                            help='Skip signing finished essays that have no signature yet')
+        parser.add_argument('--paragraphs', action='store_true',
+                            help='Also list the matching paragraph pairs')
+        parser.add_argument('--csv', action='store_true', help='Write CSV rows instead of text')
+
+    def handle(self, *args, **options):
+        competitions = Competition.objects.order_by('pk')
+        if options['competition']:
+            competitions = competitions.filter(pk=options['competition'])
+        threshold = options['threshold']
+
+        writer = None
+        if options['csv']:
+            writer = csv.writer(self.stdout)
+            writer.writerow(['competition_id', 'essay_a', 'user_a', 'essay_b', 'user_b', 'similarity'])
+
+        total = 0
+        for competition in competitions:
+            if not options['no_index']:
+                indexed = duplicates.index_missing(competition)
+                if indexed and writer is None:
+                    self.stdout.write(f'{competition.title}: signed {indexed} essays')
+
+            for essay_a, essay_b, similarity in duplicates.duplicate_pairs(competition, threshold):
+                total += 1
+                if writer is not None:
+                    writer.writerow([competition.pk, essay_a.pk, essay_a.user.username,
+                                     essay_b.pk, essay_b.user.username, f'{similarity:.3f}'])
+                    continue
+                self.stdout.write(
+                    f'{competition.title}: essay #{essay_a.pk} ({essay_a.user.username}) ~ '
+                    f'essay #{essay_b.pk} ({essay_b.user.username}): {similarity:.0%}'
+                )
+                if options['paragraphs']:
+                    for order_a, order_b, score in duplicates.matching_paragraphs(essay_a, essay_b, threshold):
+                        self.stdout.write(f'    paragraph {order_a} ~ paragraph {order_b}: {score:.0%}')
+
+        if writer is None:
+            self.stdout.write(self.style.SUCCESS(f'{total} likely duplicate pairs'))
@@ -0,0 +1,64 @@
+import secrets
+from contextlib import nullcontext
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from competition.synthetic import admin_username, generate
+from competition.testing import SCRATCH_CACHES
+from custom_admin import fulltext, search
+
+
+class Command(BaseCommand):
+    help = (
+        'Insert synthetic users, competitions and essays into a separate SQLite '
+        'database file (for local benchmarking only)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--competitions', type=int, default=5)
+        parser.add_argument('--essays', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--database-file',
+            help='SQLite file to create (or extend) and migrate instead of the configured database',
+        )
+        parser.add_argument(
+            '--use-configured-database', action='store_true',
+            help='Write into the database from settings; never do this in production',
+        )
+
+    def handle(self, *args, **options):
+        if options['database_file']:
+            if connection.vendor != 'sqlite':
+                raise CommandError('--database-file needs the SQLite backend')
+            connection.close()
+            connection.settings_dict['NAME'] = options['database_file']
+            call_command('migrate', verbosity=0, interactive=False)
+        elif not options['use_configured_database']:
+            raise CommandError(
+                f"Refusing to write synthetic data into {connection.settings_dict['NAME']}; "
+                'pass --database-file PATH, or --use-configured-database for a throwaway database'
+            )
+
+        # a scratch database's fragment versions and stats must not land in
+        # the cache shared with the server
+        scratch_caches = override_settings(CACHES=SCRATCH_CACHES) if options['database_file'] else nullcontext()
+        admin_password = secrets.token_urlsafe(12)
+        with scratch_caches:
+            counts = generate(
+                users=options['users'],
+                competitions=options['competitions'],
+                essays=options['essays'],
+                seed=options['seed'],
+                admin_password=admin_password,
+            )
+            search.rebuild()  # bulk inserts bypass the indexing signals
+            fulltext.rebuild()
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {connection.settings_dict['NAME']}"))
+        # shown once; generated users have unusable passwords
+        self.stdout.write(f"Log in as {admin_username(options['seed'])} / {admin_password}")
@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from competition import benchmark
+from competition.ai.registry import use_stub_models
+from competition.synthetic import generate_deadline
+from competition.testing import SCRATCH_CACHES
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate a deadline burst of final paragraph submissions against a scratch '
+        'database and report latency percentiles and the error rate'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users submitting at the deadline')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        use_stub_models()
+
+        old_name = connection.settings_dict['NAME']
+        directory = tempfile.TemporaryDirectory()
+        if connection.vendor == 'sqlite':
+            # a file, not the in-memory test database, so connections contend
+            # for the write lock as they do in production
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory.name, 'deadline.sqlite3')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        if connection.vendor == 'sqlite':
+            call_command('enable_wal', verbosity=0)
+        # scratch fragments and statuses must not land in the shared cache
+        scratch_settings = override_settings(CACHES=SCRATCH_CACHES)
+        scratch_settings.enable()
+        try:
+            competition = generate_deadline(users=options['users'], seed=options['seed'])
+            results = benchmark.deadline_burst(competition, concurrency=options['concurrency'])
+        finally:
+            scratch_settings.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            directory.cleanup()
+
+        output = json.dumps({'revision': benchmark.git_revision(), 'deadline_burst': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output)
+            self.stdout.write(f"Results written to {options['output']}")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from competition.ai import vector_index
+from competition.models import Competition
+
+
+class Command(BaseCommand):
+    help = 'Rewrite the per-competition essay embedding index from finished essays'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--competition', type=int, help='Only rebuild this competition id')
+
+    def handle(self, *args, **options):
+        competitions = Competition.objects.order_by('pk')
+        if options['competition']:
+            competitions = competitions.filter(pk=options['competition'])
+
+        for competition in competitions:
+            count = vector_index.rebuild(competition)
+            self.stdout.write(f'{competition.title}: {count} essays indexed')
@@ -0,0 +1,82 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from competition import rescoring
+from competition.ai import vector_index
+from competition.leaderboard import FINISHED_STATUSES, refresh_leaderboard
+from competition.models import Competition, Essay
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-run the NLP scorers over finished essays in a process pool and rebuild '
+        'the affected leaderboards; resumable from a checkpoint file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--competition', type=int, action='append', default=[],
+                            help='Competition id to rescore (repeatable; default all)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Scoring processes; 1 scores in this process')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Essays per chunk')
+        parser.add_argument('--skip-grammar', action='store_true', help='Keep the stored grammar counts')
+        parser.add_argument('--skip-topic', action='store_true', help='Keep the stored topic similarities')
+        parser.add_argument('--checkpoint', default='rescore_essays.checkpoint.json',
+                            help='Progress file used to resume an interrupted run')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        competition_ids = sorted(options['competition'])
+        grammar, topic = not options['skip_grammar'], not options['skip_topic']
+        checkpoint = rescoring.Checkpoint(options['checkpoint'], {
+            'competitions': competition_ids, 'grammar': grammar, 'topic': topic,
+        })
+        if options['restart']:
+            checkpoint.clear()
+        elif not checkpoint.load():
+            raise CommandError(
+                f"{options['checkpoint']} belongs to a run with other options; use --restart to discard it"
+            )
+        if checkpoint.last_pk:
+            self.stdout.write(f'Resuming after essay {checkpoint.last_pk} ({checkpoint.done} already rescored)')
+
+        remaining = Essay.objects.filter(status__in=FINISHED_STATUSES, pk__gt=checkpoint.last_pk)
+        if competition_ids:
+            remaining = remaining.filter(competition__in=competition_ids)
+        total = remaining.count()
+        started = time.perf_counter()
+        progress = {'count': 0}
+
+        def on_chunk(essays):
+            checkpoint.save(essays[-1].pk, len(essays))
+            progress['count'] += len(essays)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{progress['count']}/{total} essays, {progress['count'] / elapsed:.1f} essays/s"
+            )
+
+        if grammar or topic:
+            rescoring.rescore(
+                rescoring.essay_chunks(competition_ids, checkpoint.last_pk, options['chunk_size']),
+                workers=max(1, options['workers']), grammar=grammar, topic=topic, on_chunk=on_chunk,
+            )
+
+        competitions = Competition.objects.order_by('pk')
+        if competition_ids:
+            competitions = competitions.filter(pk__in=competition_ids)
+        for competition in competitions:
+            if topic:
+                # the stored vectors follow the (possibly new) embedding model
+                vector_index.rebuild(competition)
+            if competition.end_date < timezone.now():
+                refresh_leaderboard(competition, force=True)
+
+        checkpoint.clear()
+        elapsed = time.perf_counter() - started
+        rate = progress['count'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {progress['count']} essays in {elapsed:.1f}s ({rate:.1f} essays/s)"
+        ))
@@ -0,0 +1,83 @@
+import json
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from competition import benchmark
+from competition.ai.registry import use_stub_models
+from competition.synthetic import admin_username, generate
+from competition.testing import SCRATCH_CACHES
+from custom_admin import fulltext, search
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic data in a scratch test database, time the hot paths '
+        'and write the results as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--competitions', type=int, default=4)
+        parser.add_argument('--essays', type=int, default=600)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=10, help='Requests per timed path')
+        parser.add_argument('--scoring-limit', type=int, default=200, help='Essays scored for throughput')
+        parser.add_argument('--real-models', action='store_true', help='Use LanguageTool/SentenceTransformer instead of stubs')
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--compare', help='Previous results JSON to diff against')
+
+    def handle(self, *args, **options):
+        if not options['real_models']:
+            use_stub_models()
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # scratch essays must not land in the real embedding index or cache
+        vector_dir = tempfile.TemporaryDirectory()
+        scratch_settings = override_settings(VECTOR_INDEX_DIR=vector_dir.name, CACHES=SCRATCH_CACHES)
+        scratch_settings.enable()
+        try:
+            started = time.perf_counter()
+            counts = generate(
+                users=options['users'],
+                competitions=options['competitions'],
+                essays=options['essays'],
+                seed=options['seed'],
+            )
+            search.rebuild()  # bulk inserts bypass the indexing signals
+            fulltext.rebuild()
+            self.stdout.write(f'Generated {counts} in {time.perf_counter() - started:.1f}s')
+
+            admin = User.objects.get(username=admin_username(options['seed']))
+            results = benchmark.run(admin, repeat=options['repeat'], scoring_limit=options['scoring_limit'])
+        finally:
+            scratch_settings.disable()
+            vector_dir.cleanup()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'revision': benchmark.git_revision(),
+            'timestamp': timezone.now().isoformat(),
+            'stub_models': not options['real_models'],
+            'data': counts,
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output)
+            self.stdout.write(f"Results written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                previous = json.load(fh)
+            for line in benchmark.compare(previous.get('results', {}), results):
+                self.stdout.write(line)
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from competition.scheduler import run_once
+
+
+class Command(BaseCommand):
+    help = (
+        'Close competitions whose end date passed (complete and queue their unfinished essays) '
+        'and precompute their leaderboards. Run from cron, or with --loop as a service.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running instead of a single pass')
+        parser.add_argument(
+            '--interval', type=float,
+            default=getattr(settings, 'SCHEDULER_INTERVAL', 60),
+            help='Seconds between passes with --loop',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            result = run_once()
+            for competition, (completed, locked, queued) in result['closed']:
+                self.stdout.write(
+                    f'{competition.title}: closed, {completed} essays completed, '
+                    f'{locked} empty essays locked, {queued} queued for scoring'
+                )
+            for competition in result['warmed']:
+                self.stdout.write(f'{competition.title}: leaderboard precomputed')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
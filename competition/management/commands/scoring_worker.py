@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from competition.jobs import (
+    check_paragraph, claim_jobs, claim_paragraphs, leaderboard_interval, rebuild_leaderboards,
+    requeue_stale_jobs, requeue_stale_paragraphs, run_job,
+)
+
+
+class Command(BaseCommand):
+    help = 'Process queued paragraph grammar checks and essay scoring jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=getattr(settings, 'SCORING_WORKER_CONCURRENCY', 2),
+            help='Number of jobs scored in parallel',
+        )
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        self.stdout.write(f'Scoring worker started with concurrency {concurrency}')
+
+        # jobs finished since the rankings were last rebuilt
+        scored = []
+        last_rebuild = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                requeue_stale_jobs()
+                requeue_stale_paragraphs()
+                # Paragraph checks first: they keep the final submit cheap
+                paragraph_ids = claim_paragraphs(concurrency)
+                job_ids = claim_jobs(concurrency)
+                idle = not paragraph_ids and not job_ids
+
+                # one rebuild per competition for a whole batch of scored essays
+                if scored and (idle or time.monotonic() - last_rebuild >= leaderboard_interval()):
+                    for competition in rebuild_leaderboards(scored):
+                        self.stdout.write(f'Leaderboard of {competition.title} rebuilt')
+                    scored = []
+                    last_rebuild = time.monotonic()
+
+                if idle:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                for paragraph_id, status in zip(paragraph_ids, pool.map(check_paragraph, paragraph_ids)):
+                    self.stdout.write(f'Paragraph {paragraph_id}: {status}')
+                for job_id, status in zip(job_ids, pool.map(run_job, job_ids)):
+                    self.stdout.write(f'Job {job_id}: {status}')
+                    if status == 'done':
+                        scored.append(job_id)
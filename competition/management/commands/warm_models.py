@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from competition.ai.registry import LOADERS, warm_up
+
+
+class Command(BaseCommand):
+    help = 'Load the NLP models ahead of time and report how long each took'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help=f"Models to load: {', '.join(sorted(LOADERS))} (default: all)")
+
+    def handle(self, *args, **options):
+        unknown = set(options['models']) - set(LOADERS)
+        if unknown:
+            raise CommandError(f"Unknown model(s): {', '.join(sorted(unknown))}")
+
+        for name, seconds in warm_up(options['models']).items():
+            self.stdout.write(f'{name}: loaded in {seconds:.2f}s')
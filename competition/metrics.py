@@ -0,0 +1,124 @@
+"""
+Per-request performance metrics.
+
+``RequestMetricsMiddleware`` records the SQL query count, DB time, total
+time and time spent in the NLP scorers for each request, logs them and
+checks them against ``VIEW_QUERY_BUDGETS``.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('competition.metrics')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.nlp_time = 0.0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'nlp_ms': round(self.nlp_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+
+
+@contextmanager
+def track_nlp():
+    """
+    Attribute the wrapped block to NLP time of the current request, if any
+    """
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.nlp_time += time.perf_counter() - started
+
+
+@contextmanager
+def collect_metrics():
+    """
+    Record metrics for the wrapped block (also usable outside requests)
+    """
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            yield metrics
+    finally:
+        metrics.finish()
+        _current.reset(token)
+
+
+def query_budget(view_name):
+    return getattr(settings, 'VIEW_QUERY_BUDGETS', {}).get(view_name)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure every request; add X-* headers when ``REQUEST_METRICS_HEADERS``
+    is on and warn when a view exceeds its query budget.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        data = metrics.as_dict()
+        response.request_metrics = metrics
+        response.view_name = view_name
+
+        if getattr(settings, 'REQUEST_METRICS_HEADERS', settings.DEBUG):
+            response['X-Query-Count'] = str(data['queries'])
+            response['X-DB-Time-ms'] = str(data['db_ms'])
+            response['X-NLP-Time-ms'] = str(data['nlp_ms'])
+            response['Server-Timing'] = (
+                f"db;dur={data['db_ms']}, nlp;dur={data['nlp_ms']}, total;dur={data['total_ms']}"
+            )
+
+        budget = query_budget(view_name)
+        over_budget = budget is not None and data['queries'] > budget
+        log = logger.warning if over_budget else logger.info
+        log(json.dumps({
+            'view': view_name,
+            'path': request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'query_budget': budget,
+            **data,
+        }))
+        return response
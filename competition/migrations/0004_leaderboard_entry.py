@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-17 01:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0003_essay_final_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='essay',
+            name='topic_similarity',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('speed_score', models.FloatField(default=0)),
+                ('word_score', models.FloatField(default=0)),
+                ('grammar_score', models.FloatField(default=0)),
+                ('spelling_score', models.FloatField(default=0)),
+                ('topic_score', models.FloatField(default=0)),
+                ('final_score', models.FloatField(default=0)),
+                ('avg_time_seconds', models.FloatField()),
+                ('score_version', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='competition.competition')),
+                ('essay', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to='competition.essay')),
+            ],
+            options={
+                'verbose_name': 'Leaderboard Entry',
+                'verbose_name_plural': 'Leaderboard Entries',
+                'ordering': ['competition', 'rank'],
+                'unique_together': {('competition', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 01:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0004_leaderboard_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('essay', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scoring_job', to='competition.essay')),
+            ],
+            options={
+                'verbose_name': 'Scoring Job',
+                'verbose_name_plural': 'Scoring Jobs',
+                'ordering': ['available_at', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-17 01:27
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def mark_finished_paragraphs_checked(apps, schema_editor):
+    """
+    Essays finished before background checks were grammar-checked as a
+    whole; keep the worker from checking their paragraphs again. The essay
+    totals go on the first paragraph so paragraph sums still match them.
+    """
+    Essay = apps.get_model('competition', 'Essay')
+    Paragraph = apps.get_model('competition', 'Paragraph')
+    finished = Paragraph.objects.filter(essay__status__in=['completed', 'locked'])
+    finished.update(grammar_status='done')
+    essay = Essay.objects.filter(pk=OuterRef('essay_id'))
+    finished.filter(order=1).update(
+        grammar_errors=Subquery(essay.values('grammar_errors')[:1]),
+        spelling_errors=Subquery(essay.values('spelling_errors')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0006_embedding_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paragraph',
+            name='grammar_errors',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='paragraph',
+            name='grammar_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='paragraph',
+            name='spelling_errors',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_finished_paragraphs_checked, migrations.RunPython.noop),
+    ]
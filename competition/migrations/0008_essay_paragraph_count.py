@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 01:27
+
+from django.db import migrations, models
+
+
+def backfill_counts(apps, schema_editor):
+    Essay = apps.get_model('competition', 'Essay')
+    Paragraph = apps.get_model('competition', 'Paragraph')
+
+    counts = {}
+    for essay_id, content in Paragraph.objects.values_list('essay_id', 'content').iterator():
+        paragraphs, words = counts.get(essay_id, (0, 0))
+        counts[essay_id] = (paragraphs + 1, words + len(content.split()))
+
+    essays = list(Essay.objects.filter(pk__in=counts).only('pk'))
+    for essay in essays:
+        essay.paragraph_count, essay.word_count = counts[essay.pk]
+    Essay.objects.bulk_update(essays, ['paragraph_count', 'word_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0007_paragraph_grammar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='essay',
+            name='paragraph_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-17 01:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0008_essay_paragraph_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='essay',
+            index=models.Index(fields=['-started_at', '-id'], name='essay_started_id_idx'),
+        ),
+        # keyset pagination in custom_admin.views.users (auth_user has no such index)
+        migrations.RunSQL(
+            'CREATE INDEX user_date_joined_id_idx ON auth_user (date_joined, id)',
+            'DROP INDEX user_date_joined_id_idx',
+        ),
+    ]
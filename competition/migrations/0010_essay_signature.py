@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0009_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EssaySignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shingle_size', models.PositiveSmallIntegerField()),
+                ('num_perm', models.PositiveSmallIntegerField()),
+                ('bands', models.PositiveSmallIntegerField()),
+                ('shingle_count', models.PositiveIntegerField()),
+                ('minhash', models.BinaryField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='essay_signatures', to='competition.competition')),
+                ('essay', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='competition.essay')),
+            ],
+            options={
+                'verbose_name': 'Essay Signature',
+                'verbose_name_plural': 'Essay Signatures',
+            },
+        ),
+        migrations.CreateModel(
+            name='SignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='competition.competition')),
+                ('signature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='band_rows', to='competition.essaysignature')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['competition', 'bucket'], name='signature_band_bucket_idx')],
+            },
+        ),
+    ]
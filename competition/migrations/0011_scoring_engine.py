@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-17 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0010_essay_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='scoring_profile',
+            field=models.CharField(default='default', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='breakdown',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.CreateModel(
+            name='EssayComponentScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('component', models.CharField(max_length=50)),
+                ('version', models.PositiveIntegerField()),
+                ('raw', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('essay', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='component_scores', to='competition.essay')),
+            ],
+            options={
+                'verbose_name': 'Essay Component Score',
+                'verbose_name_plural': 'Essay Component Scores',
+                'unique_together': {('essay', 'component', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0011_scoring_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0012_competition_closed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paragraph',
+            name='grammar_locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-17 18:20
+
+from django.db import migrations
+
+
+def mark_finished_essays_scored(apps, schema_editor):
+    """
+    Essays finished before the scoring queue existed were scored when they
+    were submitted; record them as done so rankings keep including them
+    """
+    Essay = apps.get_model('competition', 'Essay')
+    ScoringJob = apps.get_model('competition', 'ScoringJob')
+    essays = Essay.objects.filter(
+        status__in=['completed', 'locked'], scoring_job__isnull=True,
+    ).values_list('pk', flat=True)
+    ScoringJob.objects.bulk_create(
+        (ScoringJob(essay_id=essay_id, status='done') for essay_id in essays.iterator()),
+        batch_size=500, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0013_paragraph_grammar_locked_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_finished_essays_scored, migrations.RunPython.noop),
+    ]
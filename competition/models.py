@@ -1,10 +1,8 @@
+from .ai.grammar_checker import check_text
 from .ai.topic_checker import get_topic_score
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-import language_tool_python
-
-tool = language_tool_python.LanguageTool('en-US')
 
 
 class UserProfile(models.Model):
@@ -18,10 +16,40 @@ class UserProfile(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    # fields compared against their loaded values by changed_fields()
+    TRACKED_FIELDS = ('user_id', 'status')
+
     def __str__(self):
         return f"{self.user.username} - {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded()
+        return instance
+
+    def _remember_loaded(self):
+        self._loaded = {
+            name: getattr(self, name)
+            for name in self.TRACKED_FIELDS
+            if name not in self.get_deferred_fields()
+        }
+
+    def changed_fields(self):
+        """
+        Tracked fields changed since the profile was loaded or last saved
+        (all of them for a profile that was never loaded)
+        """
+        loaded = getattr(self, '_loaded', None)
+        if loaded is None:
+            return list(self.TRACKED_FIELDS)
+        return [name for name, value in loaded.items() if getattr(self, name) != value]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_loaded()
+
     class Meta:
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
@@ -33,6 +61,10 @@ class Competition(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     max_paragraphs = models.PositiveIntegerField()
+    # key of settings.SCORING_PROFILES; see competition.scoring
+    scoring_profile = models.CharField(max_length=50, default='default')
+    # set by the scheduler once unfinished essays were closed at end_date
+    closed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -68,17 +100,21 @@ class Essay(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     word_count = models.PositiveIntegerField(default=0)
+    # maintained by Paragraph.save() so list pages don't COUNT paragraphs
+    paragraph_count = models.PositiveIntegerField(default=0)
 
     grammar_errors = models.PositiveIntegerField(default=0)
     spelling_errors = models.PositiveIntegerField(default=0)
     grammar_score = models.PositiveIntegerField(default=100)
     final_score = models.FloatField(default=0)   # ⭐ NEW FIELD
+    # essay text is immutable once completed, so the similarity is cached
+    topic_similarity = models.FloatField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.competition.title}"
 
     def current_paragraph_count(self):
-        return self.paragraphs.count()
+        return self.paragraph_count
     
     def can_add_paragraph(self):
         return (
@@ -86,31 +122,25 @@ class Essay(models.Model):
             self.current_paragraph_count() < self.competition.max_paragraphs
         )
 
-    def calculate_word_count(self):
-        total = 0
-        for paragraph in self.paragraphs.all():
-            total += len(paragraph.content.split())
-        return total
-
     # ===============================
     # GRAMMAR + SPELL CHECK
     # ===============================
-    def analyze_grammar(self):
+    def analyze_grammar(self, strict=False):
+        """
+        Sum the per-paragraph grammar/spelling counts, checking any paragraph
+        the background worker hasn't reached yet. With ``strict`` the tool
+        error is raised so the scoring worker can retry instead of storing
+        defaults.
+        """
         try:
-            full_text = " ".join(
-                p.content for p in self.paragraphs.all().order_by('order')
-            )
-
-            matches = tool.check(full_text)
-
             grammar_errors = 0
             spelling_errors = 0
 
-            for match in matches:
-                if match.rule_issue_type == 'misspelling':
-                    spelling_errors += 1
-                else:
-                    grammar_errors += 1
+            for paragraph in self.paragraphs.all():
+                if paragraph.grammar_status != 'done':
+                    paragraph.check_grammar()
+                grammar_errors += paragraph.grammar_errors
+                spelling_errors += paragraph.spelling_errors
 
             total_errors = grammar_errors + spelling_errors
             score = max(0, 100 - (total_errors * 2))
@@ -120,69 +150,58 @@ class Essay(models.Model):
             self.grammar_score = score
 
         except Exception:
+            if strict:
+                raise
             # if grammar tool fails, don't crash submission
             self.grammar_errors = 0
             self.spelling_errors = 0
             self.grammar_score = 100
 
-        # ===============================
-    # FINAL JUDGE SCORE
     # ===============================
-    def calculate_final_score(self, avg_time_seconds, optimal_words=500):
-
-        if not self.completed_at:
-            return
-
-        # --- SPEED SCORE ---
-        user_time = (self.completed_at - self.started_at).total_seconds()
-        if user_time > 0:
-            speed_score = max(0, 100 - ((user_time - avg_time_seconds) / avg_time_seconds) * 50)
-        else:
-            speed_score = 0
-
-        # --- WORD SCORE ---
-        if self.word_count <= optimal_words:
-            word_score = (self.word_count / optimal_words) * 100
-        else:
-            word_score = max(100 - ((self.word_count - optimal_words) / optimal_words) * 50, 50)
-
-        # --- GRAMMAR & SPELLING ---
-        grammar_penalty = min(5, self.grammar_errors) + min(5, self.spelling_errors)
-        grammar_score = max(0, 100 - grammar_penalty)
-        spelling_score = max(0, 100 - self.spelling_errors * 2)
-
-        # --- TOPIC SCORE ---
-        full_text = " ".join(p.content for p in self.paragraphs.all().order_by('order'))
-        topic = self.competition.title
-        similarity = get_topic_score(topic, full_text)
-        topic_score = max(0, similarity * 100)
-
-        # --- FINAL SCORE ---
-        final = (
-            speed_score * 0.15 +
-            word_score * 0.15 +
-            grammar_score * 0.25 +
-            spelling_score * 0.15 +
-            topic_score * 0.30
-        )
+    # TOPIC SIMILARITY
+    # ===============================
+    def full_text(self):
+        # Paragraph.Meta.ordering is 'order', so this also works with prefetching
+        return " ".join(p.content for p in self.paragraphs.all())
 
-        self.final_score = round(final, 2)
-        self.save()
+    def get_topic_similarity(self):
+        """
+        Return the cached topic similarity, computing it on first use
+        """
+        if self.topic_similarity is None:
+            self.topic_similarity = get_topic_score(self.competition.title, self.full_text())
+        return self.topic_similarity
 
     # ===============================
     # COMPLETE ESSAY
     # ===============================
     def complete_essay(self):
+        """
+        Lock in the essay and queue the NLP scoring for the worker
+        """
         if self.status == 'in_progress':
             self.status = 'completed'
             self.completed_at = timezone.now()
-            self.word_count = self.calculate_word_count()
-            self.analyze_grammar()
-            self.save()
+            self.save(update_fields=['status', 'completed_at'])
+            ScoringJob.enqueue(self)
+
+    def scoring_status(self):
+        """
+        Scoring state shown on the essay page; essays scored before the
+        queue existed have no job and count as done.
+        """
+        try:
+            return self.scoring_job.status
+        except ScoringJob.DoesNotExist:
+            return 'done' if self.completed_at else None
 
     class Meta:
         ordering = ['-started_at']
         unique_together = ['user', 'competition']
+        indexes = [
+            # keyset pagination in custom_admin.views.essays
+            models.Index(fields=['-started_at', '-id'], name='essay_started_id_idx'),
+        ]
         verbose_name = 'Essay'
         verbose_name_plural = 'Essays'
 
@@ -192,12 +211,202 @@ class Paragraph(models.Model):
     order = models.PositiveIntegerField()
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    # Checked in the background by the scoring worker while the essay is written
+    GRAMMAR_STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    grammar_status = models.CharField(max_length=10, choices=GRAMMAR_STATUS_CHOICES, default='queued', db_index=True)
+    grammar_errors = models.PositiveIntegerField(default=0)
+    spelling_errors = models.PositiveIntegerField(default=0)
+    grammar_locked_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return f"Paragraph {self.order} of {self.essay}"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            # Paragraphs are never edited, so running totals stay exact
+            words = len(self.content.split())
+            Essay.objects.filter(pk=self.essay_id).update(
+                paragraph_count=models.F('paragraph_count') + 1,
+                word_count=models.F('word_count') + words,
+            )
+            self.essay.paragraph_count += 1
+            self.essay.word_count += words
+
+    def check_grammar(self):
+        self.grammar_errors, self.spelling_errors = check_text(self.content)
+        self.grammar_status = 'done'
+        self.save(update_fields=['grammar_errors', 'spelling_errors', 'grammar_status'])
     
     class Meta:
         ordering = ['order']
         unique_together = ['essay', 'order']
         verbose_name = 'Paragraph'
         verbose_name_plural = 'Paragraphs'
+
+
+
+class ScoringJob(models.Model):
+    """
+    Database-backed queue entry for scoring a completed essay.
+
+    Jobs are processed by ``manage.py scoring_worker`` (see ``competition.jobs``).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    essay = models.OneToOneField(Essay, on_delete=models.CASCADE, related_name='scoring_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Scoring {self.essay_id} - {self.status}"
+
+    @classmethod
+    def enqueue(cls, essay):
+        """
+        Queue (or re-queue) scoring for an essay, with one upsert
+        """
+        job = cls(essay=essay, status='queued', attempts=0, last_error='', available_at=timezone.now())
+        cls.objects.bulk_create(
+            [job],
+            update_conflicts=True,
+            unique_fields=['essay'],
+            update_fields=['status', 'attempts', 'last_error', 'available_at', 'locked_at', 'updated_at'],
+        )
+        return job
+
+    class Meta:
+        ordering = ['available_at', 'id']
+        verbose_name = 'Scoring Job'
+        verbose_name_plural = 'Scoring Jobs'
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Precomputed ranking row for a completed essay.
+
+    Rows are rebuilt in one batch by ``competition.leaderboard`` whenever the
+    scoring inputs of a competition change, so views only read sorted rows.
+    """
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    essay = models.OneToOneField(Essay, on_delete=models.CASCADE, related_name='leaderboard_entry')
+    rank = models.PositiveIntegerField()
+    speed_score = models.FloatField(default=0)
+    word_score = models.FloatField(default=0)
+    grammar_score = models.FloatField(default=0)
+    spelling_score = models.FloatField(default=0)
+    topic_score = models.FloatField(default=0)
+    final_score = models.FloatField(default=0)
+    # scores of every component of the profile, including plugin ones
+    breakdown = models.JSONField(default=dict)
+    avg_time_seconds = models.FloatField()
+    score_version = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"#{self.rank} {self.essay}"
+
+    class Meta:
+        ordering = ['competition', 'rank']
+        unique_together = ['competition', 'rank']
+        verbose_name = 'Leaderboard Entry'
+        verbose_name_plural = 'Leaderboard Entries'
+
+
+class EmbeddingCache(models.Model):
+    """
+    Persisted sentence embedding, keyed by a hash of model name + text.
+
+    Vectors are stored as raw float32 bytes; see ``competition.ai.embedding_cache``.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    dim = models.PositiveIntegerField()
+    vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.model_name} {self.key[:12]}"
+
+    class Meta:
+        verbose_name = 'Embedding Cache Entry'
+        verbose_name_plural = 'Embedding Cache Entries'
+
+
+class EssaySignature(models.Model):
+    """
+    MinHash signature of an essay's word shingles, used to find copied
+    essays; see ``competition.duplicates``.
+
+    ``minhash`` holds ``num_perm`` raw uint32 values. The LSH band buckets
+    derived from it are stored in ``SignatureBand``.
+    """
+    essay = models.OneToOneField(Essay, on_delete=models.CASCADE, related_name='signature')
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='essay_signatures')
+    shingle_size = models.PositiveSmallIntegerField()
+    num_perm = models.PositiveSmallIntegerField()
+    bands = models.PositiveSmallIntegerField()
+    shingle_count = models.PositiveIntegerField()
+    minhash = models.BinaryField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Signature of {self.essay}"
+
+    class Meta:
+        verbose_name = 'Essay Signature'
+        verbose_name_plural = 'Essay Signatures'
+
+
+class SignatureBand(models.Model):
+    """
+    One LSH bucket of an essay signature. Essays of a competition sharing
+    any bucket are candidate duplicates.
+    """
+    signature = models.ForeignKey(EssaySignature, on_delete=models.CASCADE, related_name='band_rows')
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='+')
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['competition', 'bucket'], name='signature_band_bucket_idx'),
+        ]
+
+
+class EssayComponentScore(models.Model):
+    """
+    Raw output of one scoring component for an essay (e.g. seconds taken,
+    error count, topic similarity), kept per component version so a
+    reweighted profile only recombines stored values.
+    """
+    essay = models.ForeignKey(Essay, on_delete=models.CASCADE, related_name='component_scores')
+    component = models.CharField(max_length=50)
+    version = models.PositiveIntegerField()
+    raw = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.component} v{self.version} of {self.essay}"
+
+    class Meta:
+        unique_together = ['essay', 'component', 'version']
+        verbose_name = 'Essay Component Score'
+        verbose_name_plural = 'Essay Component Scores'
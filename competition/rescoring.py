@@ -0,0 +1,207 @@
+"""
+Bulk rescoring of finished essays (``manage.py rescore_essays``).
+
+The command process reads essays in primary-key order, one chunk at a
+time, and hands plain-data copies of them to a process pool. Each pool
+process loads the NLP models once and returns the raw grammar/spelling
+counts and topic similarities. Results are written back per chunk with
+``bulk_update`` in a short transaction that only touches scoring columns,
+so the site keeps serving while a run is in progress. After each written
+chunk the last essay id is saved to a checkpoint file, so an interrupted
+run resumes where it stopped.
+"""
+import json
+import multiprocessing
+import os
+import tempfile
+from collections import defaultdict, deque
+
+from django.db import connections, transaction
+
+from . import fragments, scoring
+from .ai import registry
+from .ai.grammar_checker import check_text
+from .ai.topic_checker import get_topic_scores
+from .leaderboard import FINISHED_STATUSES
+from .models import Essay, LeaderboardEntry, Paragraph
+
+
+def essay_chunks(competition_ids, after_pk=0, chunk_size=100):
+    """
+    Yield lists of finished essays (paragraphs prefetched) with pk above
+    ``after_pk``. Each chunk is its own keyset query, so no cursor stays
+    open while earlier chunks are being written.
+    """
+    essays = Essay.objects.filter(status__in=FINISHED_STATUSES).select_related('competition')
+    if competition_ids:
+        essays = essays.filter(competition__in=competition_ids)
+
+    while True:
+        chunk = list(
+            essays.filter(pk__gt=after_pk)
+            .order_by('pk')
+            .prefetch_related('paragraphs')[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        after_pk = chunk[-1].pk
+
+
+def to_task(essays):
+    """
+    Picklable copy of what the scorers need from a chunk of essays
+    """
+    return [
+        (essay.pk, essay.competition.title, [(p.pk, p.content) for p in essay.paragraphs.all()])
+        for essay in essays
+    ]
+
+
+def init_worker(use_stubs, models):
+    """
+    Pool initializer: set up Django and load the models once per process
+    """
+    import django
+    django.setup()
+    if use_stubs:
+        registry.use_stub_models()
+    if models:
+        registry.warm_up(models)
+
+
+def score_task(task, grammar=True, topic=True):
+    """
+    Run the scorers over one chunk. Returns
+    {essay_id: {'paragraphs': {paragraph_id: (grammar, spelling)}, 'topic_similarity': float}}
+    """
+    results = {essay_id: {'paragraphs': {}, 'topic_similarity': None} for essay_id, _, _ in task}
+
+    if grammar:
+        for essay_id, _, paragraphs in task:
+            for paragraph_id, content in paragraphs:
+                results[essay_id]['paragraphs'][paragraph_id] = check_text(content)
+
+    if topic:
+        by_topic = defaultdict(list)
+        for essay_id, title, paragraphs in task:
+            by_topic[title].append((essay_id, ' '.join(content for _, content in paragraphs)))
+        for title, texts in by_topic.items():
+            scores = get_topic_scores(title, [text for _, text in texts])
+            for (essay_id, _), score in zip(texts, scores):
+                results[essay_id]['topic_similarity'] = float(score)
+    return results
+
+
+def apply_results(essays, results, grammar=True, topic=True):
+    """
+    Store one chunk of results; returns the number of essays written
+    """
+    essay_fields, paragraphs = [], []
+    if grammar:
+        essay_fields += ['grammar_errors', 'spelling_errors', 'grammar_score']
+    if topic:
+        essay_fields.append('topic_similarity')
+
+    for essay in essays:
+        result = results[essay.pk]
+        if grammar:
+            for paragraph in essay.paragraphs.all():
+                paragraph.grammar_errors, paragraph.spelling_errors = result['paragraphs'][paragraph.pk]
+                paragraph.grammar_status = 'done'
+                paragraphs.append(paragraph)
+            # every paragraph is 'done' now, so this only sums the counts
+            essay.analyze_grammar(strict=True)
+        if topic:
+            essay.topic_similarity = result['topic_similarity']
+
+    with transaction.atomic():
+        if paragraphs:
+            Paragraph.objects.bulk_update(
+                paragraphs, ['grammar_errors', 'spelling_errors', 'grammar_status'], batch_size=500,
+            )
+        if essay_fields:
+            Essay.objects.bulk_update(essays, essay_fields, batch_size=500)
+        by_profile = defaultdict(list)
+        for essay in essays:
+            by_profile[essay.competition.scoring_profile].append(essay)
+        for name, group in by_profile.items():
+            scoring.measure(group, scoring.get_profile(name), refresh=True)
+        # Dropping the stored rows marks the rankings as stale
+        LeaderboardEntry.objects.filter(essay__in=essays).delete()
+    for competition_id in {essay.competition_id for essay in essays}:
+        fragments.invalidate_competition(competition_id)
+    return len(essays)
+
+
+class Checkpoint:
+    """
+    Progress of a run, stored as JSON and replaced atomically
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.last_pk = 0
+        self.done = 0
+
+    def load(self):
+        """
+        Resume from the file; False if it belongs to a different run
+        """
+        if not os.path.exists(self.path):
+            return True
+        with open(self.path) as fh:
+            data = json.load(fh)
+        if data.get('params') != self.params:
+            return False
+        self.last_pk = data['last_pk']
+        self.done = data['done']
+        return True
+
+    def save(self, last_pk, count):
+        self.last_pk = last_pk
+        self.done += count
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump({'params': self.params, 'last_pk': self.last_pk, 'done': self.done}, fh)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def rescore(chunks, workers=1, grammar=True, topic=True, on_chunk=None):
+    """
+    Score and store every chunk from ``chunks``, in order. ``on_chunk`` is
+    called with each written chunk (e.g. to save a checkpoint).
+    """
+    def written(essays, results):
+        apply_results(essays, results, grammar, topic)
+        if on_chunk is not None:
+            on_chunk(essays)
+
+    models = (['grammar'] if grammar else []) + (['embedding'] if topic else [])
+    if workers <= 1:
+        if models:
+            registry.warm_up(models)
+        for essays in chunks:
+            written(essays, score_task(to_task(essays), grammar, topic))
+        return
+
+    # children must not share the parent's open database connections
+    connections.close_all()
+    context = multiprocessing.get_context()
+    with context.Pool(workers, initializer=init_worker, initargs=(registry.stubs_enabled(), models)) as pool:
+        pending = deque()
+        for essays in chunks:
+            pending.append((essays, pool.apply_async(score_task, (to_task(essays), grammar, topic))))
+            # a couple of chunks per worker in flight bounds memory use
+            if len(pending) >= workers * 2:
+                essays, result = pending.popleft()
+                written(essays, result.get())
+        while pending:
+            essays, result = pending.popleft()
+            written(essays, result.get())
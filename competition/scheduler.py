@@ -0,0 +1,92 @@
+"""
+Planned work at competition deadlines (``manage.py run_scheduler``).
+
+When a competition's ``end_date`` passes, its unfinished essays are closed
+with one UPDATE: essays with paragraphs are completed as of ``end_date``
+and queued for scoring in batches; empty ones are locked. Afterwards,
+once the scoring queue of a recently ended competition has drained, its
+leaderboard (and, with a shared cache, the leaderboard fragment) is
+precomputed so the first visitor doesn't pay for the rebuild.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import fragments
+from .jobs import enqueue_missing
+from .leaderboard import refresh_leaderboard
+from .models import Competition, Essay, ScoringJob
+
+
+def warm_window():
+    return getattr(settings, 'SCHEDULER_WARM_WINDOW', 86400)
+
+
+def enqueue_batch_size():
+    return getattr(settings, 'SCHEDULER_ENQUEUE_BATCH', 500)
+
+
+def due_competitions(now):
+    return Competition.objects.filter(end_date__lt=now, closed_at__isnull=True).order_by('end_date')
+
+
+def close_competition(competition, now=None):
+    """
+    Complete or lock the unfinished essays of an ended competition and
+    queue their scoring. Returns (completed, locked, queued) counts.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        unfinished = Essay.objects.filter(competition=competition, status='in_progress')
+        completed = unfinished.filter(paragraph_count__gt=0).count()
+        changed = unfinished.update(
+            status=Case(When(paragraph_count__gt=0, then=Value('completed')), default=Value('locked')),
+            completed_at=Case(When(paragraph_count__gt=0, then=Value(competition.end_date)), default=None),
+        )
+        queued = enqueue_missing(competition, batch_size=enqueue_batch_size())
+        competition.closed_at = now
+        # also drops the cached list, leaderboard fragments and dashboard counts
+        competition.save(update_fields=['closed_at'])
+    return completed, changed - completed, queued
+
+
+def scoring_pending(competition):
+    return ScoringJob.objects.filter(
+        essay__competition=competition, status__in=['queued', 'running'],
+    ).exists()
+
+
+def warm_leaderboards(now=None):
+    """
+    Rebuild the stale leaderboards of competitions closed within
+    ``SCHEDULER_WARM_WINDOW`` seconds whose scoring has finished, and
+    render their cached fragments when the cache is shared with the web
+    server. Returns the competitions rebuilt.
+    """
+    now = now or timezone.now()
+    competitions = Competition.objects.filter(
+        closed_at__isnull=False, end_date__gte=now - timedelta(seconds=warm_window()),
+    )
+    render = fragments.shared()
+    rebuilt = []
+    for competition in competitions:
+        if scoring_pending(competition):
+            continue
+        if refresh_leaderboard(competition):
+            rebuilt.append(competition)
+        if render:
+            fragments.leaderboard(competition)
+    return rebuilt
+
+
+def run_once(now=None):
+    """
+    One scheduler pass: close due competitions, then warm leaderboards.
+    Returns {'closed': [(competition, counts)], 'warmed': [competition]}.
+    """
+    now = now or timezone.now()
+    closed = [(competition, close_competition(competition, now)) for competition in due_competitions(now)]
+    return {'closed': closed, 'warmed': warm_leaderboards(now)}
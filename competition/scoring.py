@@ -0,0 +1,309 @@
+"""
+Pluggable essay scoring engine.
+
+A score is a weighted sum of *components*. Each component has two parts:
+
+* ``measure(essay)`` returns a raw value (seconds taken, error count,
+  topic similarity, ...). Components whose raw value is an essay column
+  (``columns``) are read for a whole competition in one query instead;
+  the others may be expensive, so their raw values are stored in
+  ``EssayComponentScore`` per component version and reused.
+* ``score(frame, options)`` turns the raw values of a whole competition
+  (``frame`` maps component name -> NumPy array) into 0-100 scores, so a
+  new weighting is a cheap vectorised recombination.
+
+Competitions pick a profile from ``SCORING_PROFILES`` (weights plus
+options such as ``optimal_words``). Extra components are registered with
+``@register`` in modules listed in ``SCORING_COMPONENT_MODULES``.
+"""
+import json
+import zlib
+from dataclasses import dataclass, field
+from importlib import import_module
+
+import numpy as np
+from django.conf import settings
+
+from .models import EssayComponentScore
+
+DEFAULT_PROFILE = {
+    'weights': {'speed': 0.15, 'words': 0.15, 'grammar': 0.25, 'spelling': 0.15, 'topic': 0.30},
+    'optimal_words': 500,
+}
+
+# Essay fields read by load_columns(), in values_list() order
+ESSAY_COLUMNS = (
+    'pk', 'started_at', 'completed_at', 'word_count', 'grammar_errors', 'spelling_errors', 'topic_similarity',
+)
+
+# LeaderboardEntry columns of the built-in components
+ENTRY_FIELDS = {
+    'speed': 'speed_score',
+    'words': 'word_score',
+    'grammar': 'grammar_score',
+    'spelling': 'spelling_score',
+    'topic': 'topic_score',
+}
+
+_components = {}
+
+
+class Component:
+    """
+    Base class of scoring components. Bump ``version`` whenever
+    ``measure`` changes so stored raw values are recomputed.
+    """
+    name = None
+    version = 1
+    # Essay columns (see ESSAY_COLUMNS) the raw value is read from, if any
+    columns = ()
+
+    def prepare(self, essays):
+        """
+        Optional batch hook run before ``measure`` on essays that need it
+        """
+
+    def measure(self, essay):
+        raise NotImplementedError
+
+    def measure_columns(self, columns):
+        """
+        Vectorised ``measure`` over the arrays of ``load_columns()``
+        """
+        return columns[self.columns[0]]
+
+    def score(self, frame, options):
+        raise NotImplementedError
+
+
+def register(component_class):
+    """
+    Class decorator adding a component to the engine
+    """
+    _components[component_class.name] = component_class()
+    return component_class
+
+
+def load_plugins():
+    for module in getattr(settings, 'SCORING_COMPONENT_MODULES', []):
+        import_module(module)
+
+
+def get_component(name):
+    if name not in _components:
+        load_plugins()
+    return _components[name]
+
+
+@register
+class SpeedComponent(Component):
+    name = 'speed'
+    columns = ('duration',)
+
+    def measure(self, essay):
+        return (essay.completed_at - essay.started_at).total_seconds()
+
+    def score(self, frame, options):
+        seconds = frame['speed']
+        avg = options['avg_time_seconds']
+        return np.where(seconds > 0, np.maximum(0, 100 - ((seconds - avg) / avg) * 50), 0)
+
+
+@register
+class WordsComponent(Component):
+    name = 'words'
+    columns = ('word_count',)
+
+    def measure(self, essay):
+        return essay.word_count
+
+    def score(self, frame, options):
+        words = frame['words']
+        optimal = options['optimal_words']
+        return np.where(
+            words <= optimal,
+            words / optimal * 100,
+            np.maximum(100 - ((words - optimal) / optimal) * 50, 50),
+        )
+
+
+@register
+class GrammarComponent(Component):
+    """
+    Raw value is the language penalty: grammar and spelling errors, each
+    capped at five. It reads both counts itself, so the score doesn't
+    depend on which other components a profile lists.
+    """
+    name = 'grammar'
+    version = 2
+    columns = ('grammar_errors', 'spelling_errors')
+
+    def measure(self, essay):
+        return min(5, essay.grammar_errors) + min(5, essay.spelling_errors)
+
+    def measure_columns(self, columns):
+        return np.minimum(5, columns['grammar_errors']) + np.minimum(5, columns['spelling_errors'])
+
+    def score(self, frame, options):
+        return np.maximum(0, 100 - frame['grammar'])
+
+
+@register
+class SpellingComponent(Component):
+    name = 'spelling'
+    columns = ('spelling_errors',)
+
+    def measure(self, essay):
+        return essay.spelling_errors
+
+    def score(self, frame, options):
+        return np.maximum(0, 100 - frame['spelling'] * 2)
+
+
+@register
+class TopicComponent(Component):
+    name = 'topic'
+    # NaN where not computed yet; see leaderboard.rebuild_leaderboard
+    columns = ('topic_similarity',)
+
+    def prepare(self, essays):
+        from .leaderboard import fill_topic_similarity
+        fill_topic_similarity(essays)
+
+    def measure(self, essay):
+        return essay.get_topic_similarity()
+
+    def score(self, frame, options):
+        return np.maximum(0, frame['topic'] * 100)
+
+
+@dataclass
+class Profile:
+    name: str
+    weights: dict
+    options: dict = field(default_factory=dict)
+
+    @property
+    def components(self):
+        return [get_component(name) for name in self.weights]
+
+    @property
+    def version(self):
+        """
+        Fingerprint of weights, options and component versions; stored
+        rankings with another value are stale.
+        """
+        data = {
+            'weights': self.weights,
+            'options': self.options,
+            'components': {c.name: c.version for c in self.components},
+        }
+        return zlib.crc32(json.dumps(data, sort_keys=True).encode()) & 0x7fffffff
+
+
+def profiles():
+    return getattr(settings, 'SCORING_PROFILES', {'default': DEFAULT_PROFILE})
+
+
+def profile_choices():
+    return [(name, name.replace('_', ' ').title()) for name in profiles()]
+
+
+def get_profile(name='default'):
+    """
+    The named profile; unknown names fall back to 'default'
+    """
+    available = profiles()
+    config = dict(available.get(name) or available.get('default') or DEFAULT_PROFILE)
+    weights = config.pop('weights')
+    return Profile(name if name in available else 'default', dict(weights), config)
+
+
+def load_columns(queryset):
+    """
+    The essay columns components read, as NumPy arrays, from one query
+    """
+    rows = list(queryset.order_by('pk').values_list(*ESSAY_COLUMNS))
+    pks, started, completed, words, grammar, spelling, topic = zip(*rows) if rows else ([],) * 7
+    return {
+        'pk': np.array(pks, dtype=np.int64),
+        'duration': np.array([(c - s).total_seconds() for s, c in zip(started, completed)], dtype=np.float64),
+        'completed_at': np.array([c.timestamp() for c in completed], dtype=np.float64),
+        'word_count': np.array(words, dtype=np.float64),
+        'grammar_errors': np.array(grammar, dtype=np.float64),
+        'spelling_errors': np.array(spelling, dtype=np.float64),
+        'topic_similarity': np.array([np.nan if t is None else t for t in topic], dtype=np.float64),
+    }
+
+
+def column_frame(columns, profile):
+    """
+    Raw values of the column-backed components of ``profile``
+    """
+    return {
+        c.name: np.asarray(c.measure_columns(columns), dtype=np.float64)
+        for c in profile.components if c.columns
+    }
+
+
+def measure(essays, profile, refresh=False):
+    """
+    Raw values of the stored (non-column) components of ``profile`` for
+    ``essays`` as {component: float array}, taken from
+    ``EssayComponentScore`` where stored and measured (then stored)
+    otherwise. ``refresh`` re-measures everything, e.g. after the essay's
+    grammar/topic fields were recomputed.
+    """
+    components = [c for c in profile.components if not c.columns]
+    stored = {}
+    if not refresh and essays and components:
+        rows = EssayComponentScore.objects.filter(
+            essay__in=essays,
+            component__in=[c.name for c in components],
+        ).values_list('essay_id', 'component', 'version', 'raw')
+        versions = {c.name: c.version for c in components}
+        stored = {
+            (essay_id, name): raw
+            for essay_id, name, version, raw in rows
+            if versions[name] == version
+        }
+
+    frame, new_rows = {}, []
+    for component in components:
+        missing = [essay for essay in essays if (essay.pk, component.name) not in stored]
+        if missing:
+            component.prepare(missing)
+        values = []
+        for essay in essays:
+            raw = stored.get((essay.pk, component.name))
+            if raw is None:
+                raw = float(component.measure(essay))
+                new_rows.append(EssayComponentScore(
+                    essay=essay, component=component.name, version=component.version, raw=raw,
+                ))
+            values.append(raw)
+        frame[component.name] = np.array(values, dtype=np.float64)
+
+    if new_rows:
+        EssayComponentScore.objects.bulk_create(
+            new_rows, batch_size=500,
+            update_conflicts=True,
+            unique_fields=['essay', 'component', 'version'],
+            update_fields=['raw', 'computed_at'],
+        )
+    return frame
+
+
+def combine(frame, profile, avg_time_seconds, optimal_words=None):
+    """
+    Vectorised component scores and final scores for a frame of raw
+    values: ({component: scores}, final_scores)
+    """
+    options = {'avg_time_seconds': avg_time_seconds, **profile.options}
+    if optimal_words is not None:
+        options['optimal_words'] = optimal_words
+    options.setdefault('optimal_words', DEFAULT_PROFILE['optimal_words'])
+
+    scores = {c.name: np.asarray(c.score(frame, options), dtype=np.float64) for c in profile.components}
+    final = sum(scores[name] * weight for name, weight in profile.weights.items())
+    return scores, np.round(final, 2)
@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, Competition, Essay
+from .fragments import invalidate_competition, invalidate_competition_list
+from .stats import invalidate_stats
+from .verification import invalidate_status
 
 
 @receiver(post_save, sender=User)
@@ -14,9 +18,89 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, created, update_fields=None, **kwargs):
     """
-    Save UserProfile when User is saved
+    Save a loaded UserProfile along with its User when its fields changed.
+    Logins only save ``last_login`` and never touch the profile.
     """
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
\ No newline at end of file
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    # a profile that was never loaded has no unsaved changes
+    if not User.profile.is_cached(instance):
+        return
+    profile = getattr(instance, 'profile', None)
+    if profile is None:
+        return
+    if profile._state.adding:
+        profile.save()
+        return
+    changed = profile.changed_fields()
+    if changed:
+        profile.save(update_fields=changed + ['updated_at'])
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=Competition)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_delete, sender=Competition)
+@receiver(post_delete, sender=Essay)
+def invalidate_dashboard_stats(sender, **kwargs):
+    """
+    Drop cached dashboard counts when statuses change
+    """
+    invalidate_stats()
+
+
+@receiver(post_save, sender=Essay)
+def invalidate_dashboard_stats_for_essay(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Essays are saved often while being scored; only status changes matter
+    """
+    if created or update_fields is None or 'status' in update_fields:
+        invalidate_stats()
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_verification_status(sender, instance, **kwargs):
+    """
+    Drop the cached status used by verified_user_required
+    """
+    invalidate_status(instance.user_id)
+
+
+@receiver(post_save, sender=Competition)
+@receiver(post_delete, sender=Competition)
+def invalidate_competition_fragments(sender, instance, **kwargs):
+    """
+    Drop the cached competition list and the competition's leaderboard
+    """
+    invalidate_competition_list()
+    invalidate_competition(instance.pk)
+
+
+@receiver(post_save, sender=Essay)
+@receiver(post_delete, sender=Essay)
+def invalidate_leaderboard_fragments(sender, instance, update_fields=None, **kwargs):
+    """
+    Essays entering or leaving the ranking (completed, locked, unlocked,
+    deleted) change the cached leaderboard
+    """
+    if update_fields is None or 'status' in update_fields:
+        invalidate_competition(instance.competition_id)
+
+
+@receiver(connection_created)
+def relax_synchronous_under_wal(sender, connection, **kwargs):
+    """
+    Skip the fsync per commit on SQLite databases in WAL mode (see
+    ``manage.py enable_wal``), where a power loss can only drop the last
+    commits. The rollback journal keeps the default FULL, which it needs to
+    stay uncorrupted.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    # the raw connection, so request metrics don't count these
+    raw = connection.connection
+    if raw.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+        raw.execute('PRAGMA synchronous=NORMAL')
@@ -0,0 +1,104 @@
+"""
+Site-wide statistics for the admin dashboards.
+
+Each table is summarised with a single conditional-aggregation query and
+the result is cached for ``DASHBOARD_STATS_TTL`` seconds. Status changes
+call ``invalidate_stats()`` (see ``competition.signals``).
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Competition, Essay, UserProfile
+
+CACHE_KEY = 'competition:dashboard_stats'
+
+
+def stats_ttl():
+    return getattr(settings, 'DASHBOARD_STATS_TTL', 60)
+
+
+def user_counts():
+    counts = UserProfile.objects.aggregate(
+        pending=Count('pk', filter=Q(status='pending')),
+        verified=Count('pk', filter=Q(status='verified')),
+        rejected=Count('pk', filter=Q(status='rejected')),
+    )
+    counts['total'] = User.objects.count()
+    return counts
+
+
+def competition_counts(now):
+    return Competition.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(start_date__lte=now, end_date__gte=now)),
+        overdue=Count('pk', filter=Q(end_date__lt=now)),
+    )
+
+
+def essay_counts():
+    counts = Essay.objects.aggregate(
+        total=Count('pk'),
+        in_progress=Count('pk', filter=Q(status='in_progress')),
+        completed=Count('pk', filter=Q(status='completed')),
+        locked=Count('pk', filter=Q(status='locked')),
+    )
+    # 'completed' on the dashboards has always meant completed or locked
+    counts['finished'] = counts['completed'] + counts['locked']
+    return counts
+
+
+def competitions_per_month(now, months=12):
+    """
+    (labels, counts) of competitions created in each of the last ``months``
+    months, oldest first, from one GROUP BY query.
+    """
+    month_starts = []
+    for i in range(months - 1, -1, -1):
+        month = (now.month - i - 1) % 12 + 1
+        year = now.year + ((now.month - i - 1) // 12)
+        month_starts.append(now.replace(year=year, month=month, day=1,
+                                        hour=0, minute=0, second=0, microsecond=0))
+
+    rows = (
+        Competition.objects
+        .filter(created_at__gte=month_starts[0])
+        .annotate(month=TruncMonth('created_at'))
+        .values('month')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    per_month = {(row['month'].year, row['month'].month): row['count'] for row in rows}
+
+    labels = [start.strftime('%b %Y') for start in month_starts]
+    counts = [per_month.get((start.year, start.month), 0) for start in month_starts]
+    return labels, counts
+
+
+def compute_stats():
+    now = timezone.now()
+    month_labels, month_counts = competitions_per_month(now)
+    return {
+        'users': user_counts(),
+        'competitions': competition_counts(now),
+        'essays': essay_counts(),
+        'competitions_per_month': {'labels': month_labels, 'values': month_counts},
+    }
+
+
+def get_stats():
+    """
+    Cached dashboard statistics
+    """
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_stats()
+        cache.set(CACHE_KEY, stats, stats_ttl())
+    return stats
+
+
+def invalidate_stats():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,182 @@
+"""
+Synthetic competition data for benchmarks.
+
+Generates users, competitions and essays with realistic-looking paragraph
+text using bulk inserts, deterministically from a seed. Essays of ended
+competitions come already scored, with random results, so they are ranked.
+Generated users get unusable passwords; benchmarks log them in with
+``Client.force_login``.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Competition, Essay, Paragraph, ScoringJob, UserProfile
+
+TOPICS = [
+    'Climate Change and Our Future', 'The Role of Technology in Education',
+    'Social Media and Democracy', 'Why Reading Still Matters', 'Space Exploration',
+    'Urban Life and Green Cities', 'Artificial Intelligence at Work', 'The Value of Sport',
+]
+
+WORDS = (
+    'the of and to in a is that for it as was with be by on not he this are or his from at which '
+    'but have an they you were her she there would their we him been has when who will more no if '
+    'out so said what up its about into than them can only other new some could time these two may '
+    'then do first any my now such like our over man me even most made after also did many before '
+    'must through back years where much your way well down should because each just those people '
+    'how too little state good very make world still own see men work long get here between both '
+    'life being under never day same another know while last might us great old year off come since '
+    'against go came right used take three climate technology education society future energy '
+    'students community environment economy science history culture change important global '
+    'research policy children nature health freedom knowledge progress responsibility teh recieve'
+).split()
+
+def admin_username(seed):
+    return f'bench{seed}_admin'
+
+
+def sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 22))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def paragraph_text(rng):
+    return ' '.join(sentence(rng) for _ in range(rng.randint(3, 7)))
+
+
+def generate(users=100, competitions=5, essays=500, seed=42, batch_size=1000, admin_password=None):
+    """
+    Insert the requested volume of data and return the counts created.
+    Competitions are split between ended and active ones; essays of ended
+    competitions are completed. The superuser ``admin_username(seed)`` can
+    only log in with a password when ``admin_password`` is given.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    essays = min(essays, users * competitions)
+    password = make_password(None)
+    prefix = f'bench{seed}_'
+
+    with transaction.atomic():
+        User.objects.create_superuser(admin_username(seed), f'{prefix}admin@example.com', admin_password)
+        user_rows = User.objects.bulk_create(
+            [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password)
+             for i in range(users)],
+            batch_size=batch_size,
+        )
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, status=rng.choice(['verified'] * 8 + ['pending', 'rejected']))
+             for user in user_rows],
+            batch_size=batch_size,
+        )
+
+        comp_rows = []
+        for i in range(competitions):
+            ended = i % 2 == 0
+            start = now - timedelta(days=10 if ended else 1)
+            comp_rows.append(Competition(
+                title=f'{TOPICS[i % len(TOPICS)]} #{i + 1}',
+                description=paragraph_text(rng),
+                start_date=start,
+                end_date=now - timedelta(hours=1) if ended else now + timedelta(days=5),
+                max_paragraphs=rng.randint(3, 6),
+            ))
+        comp_rows = Competition.objects.bulk_create(comp_rows, batch_size=batch_size)
+
+        pairs = rng.sample(range(users * competitions), essays)
+        essay_rows = []
+        paragraph_texts = []
+        for pair in pairs:
+            user = user_rows[pair % users]
+            competition = comp_rows[pair // users]
+            ended = competition.end_date < now
+            count = competition.max_paragraphs if ended else rng.randint(0, competition.max_paragraphs - 1)
+            texts = [paragraph_text(rng) for _ in range(count)]
+            started_at = competition.start_date + timedelta(minutes=rng.randint(0, 600))
+            grammar_errors = rng.randint(0, 8) if ended else 0
+            spelling_errors = rng.randint(0, 6) if ended else 0
+            essay_rows.append(Essay(
+                user=user,
+                competition=competition,
+                status='completed' if ended else 'in_progress',
+                completed_at=started_at + timedelta(minutes=rng.randint(20, 240)) if ended else None,
+                paragraph_count=count,
+                word_count=sum(len(text.split()) for text in texts),
+                grammar_errors=grammar_errors,
+                spelling_errors=spelling_errors,
+                grammar_score=max(0, 100 - (grammar_errors + spelling_errors) * 2),
+                topic_similarity=round(rng.uniform(0.1, 0.8), 4) if ended else None,
+            ))
+            paragraph_texts.append(texts)
+        essay_rows = Essay.objects.bulk_create(essay_rows, batch_size=batch_size)
+
+        # started_at is auto_now_add, so spread it out after insert
+        for essay in essay_rows:
+            if essay.completed_at:
+                essay.started_at = essay.completed_at - timedelta(minutes=rng.randint(20, 240))
+        Essay.objects.bulk_update(
+            [e for e in essay_rows if e.completed_at], ['started_at'], batch_size=batch_size,
+        )
+
+        paragraph_rows = [
+            Paragraph(essay=essay, order=order, content=text)
+            for essay, texts in zip(essay_rows, paragraph_texts)
+            for order, text in enumerate(texts, start=1)
+        ]
+        Paragraph.objects.bulk_create(paragraph_rows, batch_size=batch_size)
+        ScoringJob.objects.bulk_create(
+            [ScoringJob(essay=essay, status='done') for essay in essay_rows if essay.completed_at],
+            batch_size=batch_size,
+        )
+
+    return {
+        'users': len(user_rows),
+        'competitions': len(comp_rows),
+        'essays': len(essay_rows),
+        'paragraphs': len(paragraph_rows),
+    }
+
+
+def generate_deadline(users=1000, seed=42, batch_size=1000):
+    """
+    An active competition about to end in which every one of ``users``
+    verified users has written all but the last paragraph. Returns the
+    competition.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(None)
+    prefix = f'deadline{seed}_'
+
+    with transaction.atomic():
+        competition = Competition.objects.create(
+            title=TOPICS[0],
+            description=paragraph_text(rng),
+            start_date=now - timedelta(hours=3),
+            end_date=now + timedelta(hours=1),
+            max_paragraphs=2,
+        )
+        user_rows = User.objects.bulk_create(
+            [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password)
+             for i in range(users)],
+            batch_size=batch_size,
+        )
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, status='verified') for user in user_rows], batch_size=batch_size,
+        )
+        texts = [paragraph_text(rng) for _ in user_rows]
+        essay_rows = Essay.objects.bulk_create(
+            [Essay(user=user, competition=competition, paragraph_count=1, word_count=len(text.split()))
+             for user, text in zip(user_rows, texts)],
+            batch_size=batch_size,
+        )
+        Paragraph.objects.bulk_create(
+            [Paragraph(essay=essay, order=1, content=text) for essay, text in zip(essay_rows, texts)],
+            batch_size=batch_size,
+        )
+    return competition
@@ -0,0 +1,55 @@
+"""
+Test helpers.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .metrics import query_budget
+from .models import ScoringJob
+
+# Private to one process, so test and scratch-database runs neither read
+# nor clear the entries of the shared cache the server uses
+SCRATCH_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the suite against ``SCRATCH_CACHES`` instead of the shared cache
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch_caches = override_settings(CACHES=SCRATCH_CACHES)
+        self._scratch_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._scratch_caches.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+def mark_scored(essays):
+    """
+    Record finished scoring jobs for ``essays`` so rankings include them
+    """
+    ScoringJob.objects.bulk_create([ScoringJob(essay=essay, status='done') for essay in essays])
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting a response stayed within its view's query
+    budget from ``settings.VIEW_QUERY_BUDGETS``. Requires
+    ``RequestMetricsMiddleware``.
+    """
+
+    def assertWithinQueryBudget(self, response, budget=None):
+        metrics = response.request_metrics
+        if budget is None:
+            budget = query_budget(response.view_name)
+        if budget is None:
+            self.fail(f'No query budget declared for view {response.view_name!r}')
+        self.assertLessEqual(
+            metrics.queries, budget,
+            f'{response.view_name} ran {metrics.queries} queries, budget is {budget}',
+        )
@@ -1,3 +1,1050 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .leaderboard import rebuild_leaderboard
+from .models import Competition, Essay, Paragraph, UserProfile
+from .testing import QueryBudgetMixin, mark_scored
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Hot paths must stay within VIEW_QUERY_BUDGETS as the data grows
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.competition = Competition.objects.create(
+            title='Climate Change',
+            description='Write about the climate.',
+            start_date=now - timedelta(days=2),
+            end_date=now - timedelta(hours=1),
+            max_paragraphs=2,
+        )
+        for i in range(12):
+            user = User.objects.create_user(f'writer{i}', password='pw')
+            essay = Essay.objects.create(user=user, competition=cls.competition)
+            for order in (1, 2):
+                Paragraph.objects.create(essay=essay, order=order, content='Words about the climate. ' * (5 + i))
+            Essay.objects.filter(pk=essay.pk).update(
+                status='completed',
+                completed_at=now - timedelta(hours=i + 2),
+                topic_similarity=0.5,
+            )
+        UserProfile.objects.filter(user__username='writer0').update(status='verified')
+        cls.essay = Essay.objects.get(user__username='writer0')
+        User.objects.create_superuser('admin', password='pw')
+        mark_scored(Essay.objects.filter(competition=cls.competition))
+        rebuild_leaderboard(cls.competition)
+
+    def test_leaderboard(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client.login(username='writer0', password='pw')
+        url = reverse('leaderboard', args=[self.competition.pk])
+        for path in ('cold', 'warm'):  # the first request renders the cached rows
+            with self.subTest(path=path):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinQueryBudget(response)
+
+    def test_essay_view(self):
+        self.client.login(username='writer0', password='pw')
+        response = self.client.get(reverse('essay_view', args=[self.essay.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_competition_list(self):
+        self.client.login(username='writer0', password='pw')
+        response = self.client.get(reverse('competition_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_essay_write(self):
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Oceans', description='Write about the oceans.',
+            start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1), max_paragraphs=2,
+        )
+        url = reverse('essay_write', args=[competition.pk])
+        content = 'The oceans cover most of the planet and shape its weather. '
+        self.client.login(username='writer0', password='pw')
+        for order in (1, 2):  # the last paragraph completes the essay
+            with self.subTest(order=order):
+                response = self.client.post(url, {'content': content})
+                self.assertEqual(response.status_code, 302)
+                self.assertWithinQueryBudget(response)
+        self.assertEqual(Essay.objects.get(user__username='writer0', competition=competition).scoring_job.status, 'queued')
+
+    def test_custom_admin_pages(self):
+        self.client.login(username='admin', password='pw')
+        for url in (
+            reverse('custom_admin:dashboard'),
+            reverse('custom_admin:essays'),
+            reverse('custom_admin:users'),
+            reverse('custom_admin:essay_detail', args=[self.essay.pk]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinQueryBudget(response)
+
+
+class SyntheticDataTests(TestCase):
+
+    def test_generate_keeps_denormalized_counts(self):
+        from .synthetic import generate
+
+        counts = generate(users=10, competitions=2, essays=12, seed=7)
+        self.assertEqual(counts['essays'], 12)
+        for essay in Essay.objects.all():
+            self.assertEqual(essay.paragraph_count, essay.paragraphs.count())
+
+
+class CursorPaginationTests(TestCase):
+
+    def test_pages_forward_and_back_without_gaps(self):
+        from custom_admin.pagination import CursorPaginator
+        from .synthetic import generate
+
+        generate(users=15, competitions=3, essays=35, seed=3)
+        # identical timestamps exercise the id tie-breaker
+        Essay.objects.filter(pk__lte=10).update(started_at=timezone.now())
+        paginator = CursorPaginator(Essay.objects.all(), 'started_at', per_page=10)
+
+        seen, pages, page = [], [], paginator.page()
+        while True:
+            pages.append([e.pk for e in page])
+            seen.extend(pages[-1])
+            if not page.has_next:
+                break
+            page = paginator.page(after=page.next_cursor)
+
+        expected = list(Essay.objects.order_by('-started_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(p) for p in pages], [10, 10, 10, 5])
+
+        back = paginator.page(before=page.previous_cursor)
+        self.assertEqual([e.pk for e in back], pages[-2])
+        self.assertTrue(back.has_previous)
+
+
+class AdminSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.alice = User.objects.create_user('alice_writer', email='alice@school.org')
+        cls.bob = User.objects.create_user('bob', email='bob@example.com')
+        cls.competition = Competition.objects.create(
+            title='Ocean Plastics', description='d', max_paragraphs=2,
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        Essay.objects.create(user=cls.bob, competition=cls.competition)
+
+    def test_user_search_matches_substrings(self):
+        from custom_admin import search
+
+        self.assertTrue(search.search_available())
+        found = User.objects.filter(search.user_filter('ce_wri'))
+        self.assertEqual(list(found), [self.alice])
+        found = User.objects.filter(search.user_filter('school.or'))
+        self.assertEqual(list(found), [self.alice])
+
+    def test_index_follows_edits_and_deletes(self):
+        from custom_admin import search
+
+        from django.db import connection
+
+        self.bob.email = 'robert@newmail.net'
+        self.bob.save()
+        self.assertEqual(list(User.objects.filter(search.user_filter('newmail'))), [self.bob])
+        self.assertFalse(User.objects.filter(search.user_filter('example.com')).exists())
+        # one row per object, at the rowid derived from kind and id
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {search.TABLE} WHERE kind = 'user' AND obj_id = %s", [self.bob.pk])
+            self.assertEqual(cursor.fetchall(), [(search.row_id('user', self.bob.pk),)])
+
+        self.bob.delete()
+        self.assertFalse(User.objects.filter(search.user_filter('newmail')).exists())
+
+    def test_essay_search_by_competition_title(self):
+        from custom_admin import search
+
+        essays = Essay.objects.filter(
+            search.user_filter('plastic', 'user__') | search.competition_filter('plastic', 'competition__')
+        )
+        self.assertEqual(essays.count(), 1)
+
+
+class EssayTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Cities', description='d', max_paragraphs=2,
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        cls.essays = []
+        texts = [
+            ('Public transport reduces traffic in crowded cities.', 'Bicycles help too.'),
+            ('Green parks make <cities> healthier places to live.', 'Traffic is a problem.'),
+        ]
+        for i, paragraphs in enumerate(texts):
+            user = User.objects.create_user(f'citizen{i}')
+            essay = Essay.objects.create(user=user, competition=competition)
+            for order, content in enumerate(paragraphs, start=1):
+                Paragraph.objects.create(essay=essay, content=content, order=order)
+            cls.essays.append(essay)
+
+    def test_matches_word_forms_and_highlights(self):
+        from custom_admin import fulltext
+
+        self.assertTrue(fulltext.search_available())
+        hits = fulltext.search_essays('city')
+        self.assertEqual({essay_id for essay_id, _, _, _ in hits}, {e.pk for e in self.essays})
+        snippets = {essay_id: snippet for essay_id, _, snippet, _ in hits}
+        self.assertIn('&lt;<mark>cities</mark>&gt;', snippets[self.essays[1].pk])
+
+    def test_phrase_search(self):
+        from custom_admin import fulltext
+
+        hits = fulltext.search_essays('"public transport"')
+        self.assertEqual([(essay_id, order) for essay_id, order, _, _ in hits], [(self.essays[0].pk, 1)])
+        self.assertEqual(fulltext.search_essays('"transport public"'), [])
+
+    def test_deleted_paragraphs_leave_the_index(self):
+        from custom_admin import fulltext
+
+        self.essays[0].paragraphs.get(order=2).delete()
+        self.assertEqual(fulltext.search_essays('bicycles'), [])
+        self.assertEqual(fulltext.rebuild(chunk_size=2), 3)
+        self.assertEqual(len(fulltext.search_essays('traffic')), 2)
+
+
+class DuplicateDetectionTests(TestCase):
+    ORIGINAL = [
+        'Renewable energy is changing how cities plan their power grids and how families heat their homes.',
+        'Solar panels on school roofs teach students about electricity while cutting the monthly bills.',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.competition = Competition.objects.create(
+            title='Energy', description='d', max_paragraphs=2,
+            start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+        )
+        copied = [cls.ORIGINAL[0], cls.ORIGINAL[1].replace('monthly', 'yearly')]
+        other = [
+            'Wind farms need careful placement away from migrating birds and busy shipping lanes.',
+            'Batteries store surplus power for evenings when the sun has already set.',
+        ]
+        cls.original, cls.copy, cls.other = [
+            cls.make_essay(f'energy{i}', texts) for i, texts in enumerate([cls.ORIGINAL, copied, other])
+        ]
+
+    @classmethod
+    def make_essay(cls, username, texts):
+        essay = Essay.objects.create(
+            user=User.objects.create_user(username), competition=cls.competition, status='completed',
+        )
+        for order, content in enumerate(texts, start=1):
+            Paragraph.objects.create(essay=essay, content=content, order=order)
+        return essay
+
+    def test_copied_essay_is_found(self):
+        from . import duplicates
+
+        self.assertEqual(duplicates.index_missing(self.competition), 3)
+        similar = duplicates.find_similar(self.original)
+        self.assertEqual([signature.essay_id for signature, _ in similar], [self.copy.pk])
+        self.assertGreater(similar[0][1], 0.6)
+
+        pairs = duplicates.duplicate_pairs(self.competition)
+        self.assertEqual([(a.pk, b.pk) for a, b, _ in pairs], [(self.original.pk, self.copy.pk)])
+        self.assertEqual(
+            [(a, b) for a, b, _ in duplicates.matching_paragraphs(self.original, self.copy)], [(1, 1), (2, 2)],
+        )
+        self.assertEqual(duplicates.index_missing(self.competition), 0)
+
+    def test_essay_without_words_is_indexed_once(self):
+        from . import duplicates
+
+        blank = self.make_essay('energy_blank', ['... !!! ???'])
+        duplicates.index_missing(self.competition)
+        self.assertEqual(blank.signature.shingle_count, 0)
+        self.assertFalse(blank.signature.band_rows.exists())
+        self.assertEqual(duplicates.find_similar(blank), [])
+        self.assertEqual(duplicates.index_missing(self.competition), 0)
+
+    def test_signature_estimates_jaccard(self):
+        from . import duplicates
+
+        a = duplicates.shingles(' '.join(self.ORIGINAL))
+        b = duplicates.shingles(' '.join(self.ORIGINAL[:1]))
+        estimated = duplicates.estimate(duplicates.minhash(a), duplicates.minhash(b))
+        self.assertAlmostEqual(estimated, duplicates.jaccard(a, b), delta=0.15)
+
+
+class VectorIndexTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(NLP_STUB_MODELS=True, VECTOR_INDEX_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        now = timezone.now()
+        self.competition = Competition.objects.create(
+            title='Oceans', description='d', max_paragraphs=1,
+            start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+        )
+        self.essays = [self.make_essay(f'diver{i}', text) for i, text in enumerate([
+            'Coral reefs bleach when warm ocean water stresses the coral and algae.',
+            'Warm ocean water stresses coral reefs, and the algae leave, so reefs bleach.',
+            'Fishing quotas protect cod stocks in the cold northern seas.',
+        ])]
+
+    def make_essay(self, username, text):
+        essay = Essay.objects.create(
+            user=User.objects.create_user(username), competition=self.competition, status='completed',
+        )
+        Paragraph.objects.create(essay=essay, content=text, order=1)
+        return essay
+
+    def test_similar_essays_and_incremental_append(self):
+        from .ai import vector_index
+
+        self.assertEqual(vector_index.rebuild(self.competition), 3)
+        original, paraphrase, unrelated = self.essays
+        similar = vector_index.similar_essays(original)
+        self.assertEqual([essay_id for essay_id, _ in similar], [paraphrase.pk, unrelated.pk])
+        self.assertGreater(similar[0][1], similar[1][1])
+
+        late = self.make_essay('diver3', 'Coral reefs bleach in warm ocean water.')
+        vector_index.add_essay(late)
+        self.assertIn(late.pk, [essay_id for essay_id, _ in vector_index.similar_essays(original)])
+        self.assertEqual(len(vector_index.get_index(self.competition.pk)), 4)
+
+    def test_rewrite_keeps_rows_appended_meanwhile(self):
+        import numpy as np
+        from .ai.vector_index import VectorIndex
+
+        index = VectorIndex(self.directory, 'busy')
+        index.replace([1, 2], np.eye(2, 4, dtype=np.float32))
+        since = index.mark()
+        index.append(3, np.eye(4, dtype=np.float32)[2])  # scored during the rebuild
+        index.append(1, np.eye(4, dtype=np.float32)[3])  # re-scored: its last row wins
+        index.replace([1, 2], np.eye(2, 4, dtype=np.float32), since=since)
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.vector(1).tolist(), [0, 0, 0, 1])
+        # superseded rows are masked, the mapping is not copied
+        ids, matrix, live = index._load()
+        self.assertIsInstance(matrix, np.memmap)
+        self.assertEqual(index.search(np.eye(4, dtype=np.float32)[0], k=5), [(2, 0.0), (3, 0.0), (1, 0.0)])
+
+    def test_approximate_search_finds_nearest_row(self):
+        import numpy as np
+        from .ai.vector_index import VectorIndex
+
+        rng = np.random.default_rng(0)
+        matrix = rng.standard_normal((600, 64)).astype(np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        index = VectorIndex(self.directory, 'random')
+        index.replace(range(1, 601), matrix)
+
+        query = matrix[41] + 0.1 * rng.standard_normal(64).astype(np.float32)
+        query /= np.linalg.norm(query)
+        self.assertEqual(index.search(query, k=1, approximate=True)[0][0], 42)
+        self.assertEqual(index.search(query, k=1, approximate=False)[0][0], 42)
+
+
+class RescoreEssaysTests(TestCase):
+
+    def test_rescore_resumes_from_checkpoint(self):
+        import json
+        import os
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Forests', description='d', max_paragraphs=1,
+            start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+        )
+        essays = []
+        for i in range(3):
+            essay = Essay.objects.create(
+                user=User.objects.create_user(f'ranger{i}'), competition=competition,
+                status='completed', completed_at=now - timedelta(days=1, hours=1),
+            )
+            Paragraph.objects.create(essay=essay, content=f'Forests store carbon in wood and soil {i}.', order=1)
+            essays.append(essay)
+        mark_scored(essays)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        checkpoint = os.path.join(directory.name, 'checkpoint.json')
+        with open(checkpoint, 'w') as fh:
+            json.dump({'params': {'competitions': [competition.pk], 'grammar': True, 'topic': True},
+                       'last_pk': essays[0].pk, 'done': 1}, fh)
+
+        out = StringIO()
+        with override_settings(NLP_STUB_MODELS=True, VECTOR_INDEX_DIR=directory.name):
+            call_command('rescore_essays', competition=[competition.pk], workers=1,
+                         checkpoint=checkpoint, stdout=out)
+
+        self.assertIn('Rescored 2 essays', out.getvalue())
+        self.assertFalse(os.path.exists(checkpoint))
+        # the essay before the checkpoint was left alone
+        statuses = dict(Paragraph.objects.values_list('essay_id', 'grammar_status'))
+        self.assertEqual([statuses[essay.pk] for essay in essays], ['queued', 'done', 'done'])
+        self.assertEqual(competition.leaderboard_entries.count(), 3)
+
+
+class ScoringEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.competition = Competition.objects.create(
+            title='Rivers', description='d', max_paragraphs=1,
+            start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+        )
+        for i in range(3):
+            essay = Essay.objects.create(
+                user=User.objects.create_user(f'rower{i}'), competition=cls.competition,
+                status='completed', grammar_errors=i, spelling_errors=2 * i,
+            )
+            Essay.objects.filter(pk=essay.pk).update(completed_at=essay.started_at + timedelta(minutes=10 + i))
+            Paragraph.objects.create(essay=essay, content='Rivers carry water to the sea. ' * (i + 1), order=1)
+        mark_scored(Essay.objects.filter(competition=cls.competition))
+
+    @override_settings(NLP_STUB_MODELS=True)
+    def test_reweighting_recombines_stored_components(self):
+        from .leaderboard import is_stale
+        from .models import EssayComponentScore
+
+        rebuild_leaderboard(self.competition)
+        self.assertFalse(is_stale(self.competition))
+        # built-in components read essay columns; nothing extra is stored
+        self.assertFalse(EssayComponentScore.objects.exists())
+
+        # reweighting must not run the NLP models again
+        weights = {'speed': 0, 'words': 0, 'grammar': 0.5, 'spelling': 0.5, 'topic': 0.0}
+        with override_settings(SCORING_PROFILES={'default': {'weights': weights}}), \
+                mock.patch('competition.leaderboard.get_topic_scores', side_effect=AssertionError):
+            self.assertTrue(is_stale(self.competition))
+            with self.assertNumQueries(7):
+                rebuild_leaderboard(self.competition)
+            entries = list(self.competition.leaderboard_entries.order_by('rank'))
+
+        self.assertEqual([entry.essay.grammar_errors for entry in entries], [0, 1, 2])
+        for entry in entries:
+            expected = 0.5 * entry.breakdown['grammar'] + 0.5 * entry.breakdown['spelling']
+            self.assertAlmostEqual(entry.final_score, expected, places=2)
+
+    def test_grammar_score_ignores_the_rest_of_the_profile(self):
+        import numpy as np
+        from .scoring import column_frame, combine, get_profile, load_columns
+
+        columns = load_columns(Essay.objects.filter(competition=self.competition))
+        scores = []
+        for weights in ({'grammar': 0.5, 'spelling': 0.5}, {'grammar': 1.0}):
+            with override_settings(SCORING_PROFILES={'default': {'weights': weights}}):
+                profile = get_profile()
+                scores.append(combine(column_frame(columns, profile), profile, 1)[0]['grammar'])
+        # grammar errors 0, 1, 2 and spelling errors 0, 2, 4
+        np.testing.assert_array_equal(scores[0], [100, 97, 94])
+        np.testing.assert_array_equal(scores[1], scores[0])
+
+    def test_registered_component_in_profile(self):
+        import numpy as np
+        from . import scoring
+        from .models import EssayComponentScore
+
+        @scoring.register
+        class ParagraphsComponent(scoring.Component):
+            name = 'test_paragraphs'
+
+            def measure(self, essay):
+                return essay.paragraph_count
+
+            def score(self, frame, options):
+                return np.minimum(100, frame['test_paragraphs'] * 100)
+
+        self.addCleanup(scoring._components.pop, 'test_paragraphs')
+        with override_settings(SCORING_PROFILES={'default': {'weights': {'test_paragraphs': 1.0}}}):
+            rebuild_leaderboard(self.competition)
+        self.assertEqual(
+            set(self.competition.leaderboard_entries.values_list('final_score', flat=True)), {100.0},
+        )
+        # plugin raw values are stored for the next recombination
+        self.assertEqual(EssayComponentScore.objects.filter(component='test_paragraphs').count(), 3)
+
+
+class ModelRegistryTests(TestCase):
+
+    def test_models_follow_setting_changes(self):
+        from .ai import registry
+        from .ai.stubs import StubGrammarTool
+
+        with override_settings(NLP_STUB_MODELS=True):
+            self.assertIsInstance(registry.get_model('grammar'), StubGrammarTool)
+            self.assertEqual(list(registry.warm_up(['embedding'])), ['embedding'])
+        # the stubs must not outlive the override
+        self.assertFalse(registry.is_loaded('grammar'))
+        self.assertEqual(registry.load_times(), {})
+
+
+class EmbeddingCacheTests(TestCase):
+
+    def encode(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def test_hits_stay_reads_until_the_touch_interval(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .ai.embedding_cache import cached_encode, make_key
+        from .models import EmbeddingCache
+
+        cached_encode('m', ['a', 'bb'], self.encode)
+        with CaptureQueriesContext(connection) as ctx:
+            cached_encode('m', ['a', 'bb'], mock.Mock(side_effect=AssertionError))
+        self.assertEqual([q['sql'].split()[0] for q in ctx.captured_queries], ['SELECT'])
+
+        EmbeddingCache.objects.update(last_used_at=timezone.now() - timedelta(hours=2))
+        cached_encode('m', ['a'], self.encode)
+        recent = EmbeddingCache.objects.filter(last_used_at__gt=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(list(recent.values_list('key', flat=True)), [make_key('m', 'a')])
+
+    @override_settings(EMBEDDING_CACHE_MAX_ENTRIES=2, EMBEDDING_CACHE_EVICT_EVERY=3)
+    def test_size_bound_is_checked_every_few_inserts(self):
+        from .ai import embedding_cache
+        from .models import EmbeddingCache
+
+        self.addCleanup(setattr, embedding_cache, '_added', 0)
+        embedding_cache._added = 0
+        embedding_cache.cached_encode('m', ['a', 'b'], self.encode)
+        self.assertEqual(EmbeddingCache.objects.count(), 2)
+        embedding_cache.cached_encode('m', ['c', 'd'], self.encode)
+        self.assertEqual(EmbeddingCache.objects.count(), 2)
+
+
+class VerificationStatusTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='pw')
+        UserProfile.objects.filter(user=cls.user).update(status='verified')
+
+    def test_profile_is_loaded_with_the_user(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.login(username='reader', password='pw')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('competition_list'))
+        self.assertEqual(response.status_code, 200)
+        profile_queries = [q['sql'] for q in ctx.captured_queries if 'competition_userprofile' in q['sql']]
+        # the joined user lookup only; no separate profile query
+        self.assertEqual(len(profile_queries), 1)
+        self.assertIn('JOIN', profile_queries[0])
+
+    def test_sessions_from_before_profile_backend_stay_valid(self):
+        from django.core.cache import cache
+
+        cache.clear()  # statuses cached by other tests' users with the same pk
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_cached_status_follows_profile_changes(self):
+        from .verification import get_status
+
+        self.assertEqual(get_status(User.objects.get(pk=self.user.pk)), 'verified')
+        # a later request reads the cached value
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_status(user), 'verified')
+
+        profile = UserProfile.objects.get(user=user)
+        profile.status = 'rejected'
+        profile.save()
+        self.assertEqual(get_status(User.objects.get(pk=user.pk)), 'rejected')
+
+
+class ProfileSaveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('skater', password='pw')
+
+    def test_login_does_not_write_the_profile(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('login'), {'username': 'skater', 'password': 'pw'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        queries = [q['sql'] for q in ctx.captured_queries]
+        self.assertFalse([sql for sql in queries if 'competition_userprofile' in sql])
+        # user lookup, session lookup, session insert, last_login update, session update
+        self.assertEqual(len([sql for sql in queries if not sql.startswith(('SAVEPOINT', 'RELEASE'))]), 5)
+
+    def test_user_save_writes_only_a_changed_profile(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        updated_at = user.profile.updated_at
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'competition_userprofile' in q['sql']])
+
+        user.profile.status = 'verified'
+        user.save()
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual(profile.status, 'verified')
+        self.assertGreater(profile.updated_at, updated_at)
+        self.assertEqual(user.profile.changed_fields(), [])
+
+
+class FragmentCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.competition = Competition.objects.create(
+            title='Oceans', description='Write about the sea.', max_paragraphs=1,
+            start_date=now - timedelta(days=2), end_date=now - timedelta(hours=1),
+        )
+        for i in range(3):
+            user = User.objects.create_user(f'sailor{i}', password='pw')
+            essay = Essay.objects.create(user=user, competition=cls.competition)
+            Paragraph.objects.create(essay=essay, order=1, content='The sea is wide and deep. ' * (3 + i))
+            Essay.objects.filter(pk=essay.pk).update(
+                status='completed', completed_at=now - timedelta(hours=i + 2), topic_similarity=0.5,
+            )
+        cls.reader = User.objects.create_user('reader', password='pw')
+        UserProfile.objects.filter(user__username__in=['reader', 'sailor0']).update(status='verified')
+        mark_scored(Essay.objects.filter(competition=cls.competition))
+        rebuild_leaderboard(cls.competition)
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_finished_leaderboard_is_served_from_cache(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.login(username='reader', password='pw')
+        url = reverse('leaderboard', args=[self.competition.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertContains(response, 'sailor2')
+        tables = ('competition_competition', 'competition_essay', 'competition_leaderboardentry')
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if any(t in q['sql'] for t in tables)])
+
+    def test_own_row_is_rendered_per_user(self):
+        url = reverse('leaderboard', args=[self.competition.pk])
+        self.client.login(username='reader', password='pw')
+        self.client.get(url)
+        self.client.login(username='sailor0', password='pw')
+        response = self.client.get(url)
+        self.assertContains(response, 'lb-you-tag', count=1)
+        self.assertContains(response, 'lb-btn-view', count=1)
+
+    def test_locking_an_essay_invalidates_the_leaderboard(self):
+        self.client.login(username='reader', password='pw')
+        url = reverse('leaderboard', args=[self.competition.pk])
+        self.assertContains(self.client.get(url), 'sailor1')
+
+        essay = Essay.objects.get(user__username='sailor1')
+        essay.status = 'in_progress'
+        essay.save()
+        self.assertNotContains(self.client.get(url), 'sailor1')
+
+    def test_view_never_rebuilds_and_skips_unscored_essays(self):
+        essay = Essay.objects.create(user=User.objects.create_user('swimmer'), competition=self.competition)
+        Paragraph.objects.create(essay=essay, order=1, content='Waves break on the shore.')
+        essay.complete_essay()  # scoring job still queued
+
+        self.client.login(username='reader', password='pw')
+        with mock.patch('competition.leaderboard.rebuild_leaderboard', side_effect=AssertionError), \
+                mock.patch('competition.leaderboard.get_topic_scores', side_effect=AssertionError):
+            response = self.client.get(reverse('leaderboard', args=[self.competition.pk]))
+        self.assertContains(response, 'sailor2')
+        self.assertNotContains(response, 'swimmer')
+
+    def test_competition_list_follows_edits_and_user_essays(self):
+        self.client.login(username='sailor0', password='pw')
+        response = self.client.get(reverse('competition_list'))
+        self.assertContains(response, 'Oceans')
+        self.assertContains(response, 'View Essay')
+
+        self.competition.title = 'Seas'
+        self.competition.save()
+        response = self.client.get(reverse('competition_list'))
+        self.assertContains(response, 'Seas')
+        self.assertNotContains(response, 'Oceans')
+
+
+class EssaySubmissionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.competition = Competition.objects.create(
+            title='Rivers', description='d', max_paragraphs=2,
+            start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1),
+        )
+        cls.user = User.objects.create_user('rower', password='pw')
+        UserProfile.objects.filter(user=cls.user).update(status='verified')
+
+    def test_last_paragraph_completes_the_essay(self):
+        from .models import ScoringJob
+
+        self.client.login(username='rower', password='pw')
+        url = reverse('essay_write', args=[self.competition.pk])
+        text = 'Rivers carry water and silt from the hills down to the sea. '
+        self.assertRedirects(self.client.post(url, {'content': text}), url)
+        essay = Essay.objects.get(user=self.user)
+        response = self.client.post(url, {'content': text * 2})
+        self.assertRedirects(response, reverse('essay_view', args=[essay.pk]))
+
+        essay.refresh_from_db()
+        self.assertEqual((essay.status, essay.paragraph_count), ('completed', 2))
+        self.assertEqual(list(essay.paragraphs.values_list('order', flat=True)), [1, 2])
+        self.assertTrue(ScoringJob.objects.filter(essay=essay, status='queued').exists())
+
+    def test_full_essay_is_completed_under_the_lock_not_by_the_page(self):
+        from .models import ScoringJob
+        from .submissions import add_paragraph
+
+        essay = Essay.objects.create(user=self.user, competition=self.competition)
+        Paragraph.objects.create(essay=essay, order=1, content='Rivers carry silt. ' * 4)
+        Competition.objects.filter(pk=self.competition.pk).update(max_paragraphs=1)
+
+        self.client.login(username='rower', password='pw')
+        response = self.client.get(reverse('essay_write', args=[self.competition.pk]))
+        self.assertRedirects(response, reverse('essay_view', args=[essay.pk]), fetch_redirect_response=False)
+        essay.refresh_from_db()
+        self.assertEqual(essay.status, 'in_progress')
+        self.assertFalse(ScoringJob.objects.exists())
+
+        essay, paragraph = add_paragraph(essay.pk, 1, 'Too late.')
+        self.assertIsNone(paragraph)
+        self.assertEqual(Essay.objects.get(pk=essay.pk).status, 'completed')
+        self.assertEqual(ScoringJob.objects.filter(essay=essay, status='queued').count(), 1)
+
+    @override_settings(SUBMISSION_RETRY_DELAY=0)
+    def test_lock_contention_is_retried(self):
+        from django.db import OperationalError
+        from .submissions import retry_on_lock
+
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'saved'
+
+        # outside the test transaction, as in a request
+        with mock.patch('competition.submissions.connection', mock.Mock(in_atomic_block=False)):
+            self.assertEqual(retry_on_lock(flaky), 'saved')
+            with self.assertRaises(OperationalError):
+                retry_on_lock(mock.Mock(side_effect=OperationalError('no such table')))
+        self.assertEqual(len(calls), 3)
+
+
+    def test_synchronous_is_relaxed_only_under_wal(self):
+        import os
+        from django.db import connection
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        scratch = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory.name, 'db.sqlite3')})
+
+        def synchronous():
+            with scratch.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous')
+                return cursor.fetchone()[0]
+
+        self.assertEqual(synchronous(), 2)  # FULL with the rollback journal
+        with scratch.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+        scratch.close()
+        self.assertEqual(synchronous(), 1)  # NORMAL once the file is in WAL mode
+        scratch.close()
+
+
+class ScoringWorkerTests(TestCase):
+
+    def test_essays_finished_before_the_queue_stay_ranked(self):
+        import importlib
+        from django.apps import apps
+        from .models import ScoringJob
+
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Canyons', description='d', max_paragraphs=1,
+            start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+        )
+        for i, status in enumerate(['completed', 'locked', 'in_progress']):
+            essay = Essay.objects.create(user=User.objects.create_user(f'hiker{i}'), competition=competition)
+            Paragraph.objects.create(essay=essay, order=1, content='Rivers carve the rock. ' * (i + 2))
+            Essay.objects.filter(pk=essay.pk).update(
+                status=status, completed_at=now - timedelta(days=1), topic_similarity=0.5,
+            )
+        self.assertFalse(ScoringJob.objects.exists())
+
+        migration = importlib.import_module('competition.migrations.0014_backfill_scoring_jobs')
+        migration.mark_finished_essays_scored(apps, None)
+        self.assertEqual(ScoringJob.objects.filter(status='done').count(), 2)
+        rebuild_leaderboard(competition)
+        self.assertEqual(competition.leaderboard_entries.count(), 2)
+
+    def test_enqueue_requeues_a_finished_job(self):
+        from .models import ScoringJob
+
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Glaciers', description='d', max_paragraphs=1,
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        essay = Essay.objects.create(user=User.objects.create_user('skier'), competition=competition)
+        with self.assertNumQueries(1):
+            ScoringJob.enqueue(essay)
+        ScoringJob.objects.filter(essay=essay).update(status='failed', attempts=3, last_error='boom', locked_at=now)
+
+        ScoringJob.enqueue(essay)
+        job = ScoringJob.objects.get(essay=essay)
+        self.assertEqual((job.status, job.attempts, job.last_error, job.locked_at), ('queued', 0, '', None))
+
+    def test_scored_batch_rebuilds_the_ranking_once(self):
+        from .jobs import claim_jobs, rebuild_leaderboards, run_job
+
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Deserts', description='d', max_paragraphs=1,
+            start_date=now - timedelta(days=1), end_date=now - timedelta(minutes=5),
+        )
+        for i in range(3):
+            essay = Essay.objects.create(user=User.objects.create_user(f'nomad{i}'), competition=competition)
+            Paragraph.objects.create(essay=essay, order=1, content='Sand dunes shift with the wind. ' * (i + 1))
+            essay.complete_essay()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(NLP_STUB_MODELS=True, VECTOR_INDEX_DIR=directory.name):
+            job_ids = claim_jobs(10)
+            for job_id in job_ids:
+                run_job(job_id)
+            # scoring alone leaves the ranking untouched
+            self.assertFalse(competition.leaderboard_entries.exists())
+            with mock.patch('competition.jobs.rebuild_leaderboard', wraps=rebuild_leaderboard) as rebuild:
+                self.assertEqual(rebuild_leaderboards(job_ids), [competition])
+        rebuild.assert_called_once_with(competition)
+        self.assertEqual(competition.leaderboard_entries.count(), 3)
+
+    def test_stale_paragraph_checks_are_reclaimed(self):
+        from .jobs import claim_paragraphs, requeue_stale_paragraphs
+
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Lakes', description='d', max_paragraphs=3,
+            start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1),
+        )
+        essay = Essay.objects.create(user=User.objects.create_user('diver'), competition=competition)
+        for order in (1, 2):
+            Paragraph.objects.create(essay=essay, order=order, content='Lakes freeze in winter.')
+        claimed = claim_paragraphs(2)
+        Paragraph.objects.filter(pk=claimed[0]).update(grammar_locked_at=now - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale_paragraphs(), 1)
+        self.assertEqual(claim_paragraphs(2), claimed[:1])
+
+
+class SchedulerTests(TestCase):
+
+    def test_ended_competition_is_closed_and_warmed(self):
+        from django.core.cache import cache
+        from .jobs import claim_jobs, run_job
+        from .models import ScoringJob
+        from .scheduler import run_once
+
+        cache.clear()
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Mountains', description='d', max_paragraphs=3,
+            start_date=now - timedelta(days=1), end_date=now - timedelta(minutes=5),
+        )
+        essays = []
+        for i in range(3):
+            essay = Essay.objects.create(user=User.objects.create_user(f'climber{i}'), competition=competition)
+            for order in range(1, i + 1):
+                Paragraph.objects.create(essay=essay, order=order, content='Mountains rise above the clouds.')
+            essays.append(essay)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(NLP_STUB_MODELS=True, VECTOR_INDEX_DIR=directory.name):
+            result = run_once(now)
+            self.assertEqual(result['closed'][0][1], (2, 1, 2))
+            # scoring still queued: nothing precomputed yet
+            self.assertEqual(result['warmed'], [])
+            for job_id in claim_jobs(10):
+                run_job(job_id)
+            self.assertEqual(run_once(now)['warmed'], [competition])
+
+        statuses = dict(Essay.objects.values_list('pk', 'status'))
+        self.assertEqual([statuses[e.pk] for e in essays], ['locked', 'completed', 'completed'])
+        self.assertEqual(Essay.objects.get(pk=essays[2].pk).completed_at, competition.end_date)
+        self.assertEqual(ScoringJob.objects.filter(status='done').count(), 2)
+        self.assertEqual(competition.leaderboard_entries.count(), 2)
+        # a second pass has nothing left to do
+        self.assertEqual(run_once(now), {'closed': [], 'warmed': []})
+
+    def test_fragments_are_warmed_only_in_a_shared_cache(self):
+        from . import fragments
+        from .scheduler import warm_leaderboards
+
+        now = timezone.now()
+        competition = Competition.objects.create(
+            title='Rivers', description='d', max_paragraphs=1,
+            start_date=now - timedelta(days=1), end_date=now - timedelta(minutes=5), closed_at=now,
+        )
+        essay = Essay.objects.create(
+            user=User.objects.create_user('rower'), competition=competition, status='completed', final_score=60,
+        )
+        mark_scored([essay])
+
+        # the test cache is private to this process: nothing to warm
+        self.assertFalse(fragments.shared())
+        with mock.patch('competition.fragments.leaderboard') as render:
+            warm_leaderboards(now)
+        render.assert_not_called()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name}
+        with override_settings(CACHES={'default': shared}):
+            self.assertTrue(fragments.shared())
+            with mock.patch('competition.fragments.leaderboard') as render:
+                warm_leaderboards(now)
+        render.assert_called_once_with(competition)
+
+
+class EssayExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.competition = Competition.objects.create(
+            title='Deserts', description='d', max_paragraphs=2,
+            start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+        )
+        for i, status in enumerate(['completed', 'in_progress', 'completed']):
+            essay = Essay.objects.create(
+                user=User.objects.create_user(f'nomad{i}'), competition=cls.competition,
+                status=status, completed_at=now - timedelta(days=1, hours=1) if status == 'completed' else None,
+            )
+            Paragraph.objects.create(essay=essay, order=1, content=f'Sand dunes move with the wind {i}.')
+            Paragraph.objects.create(essay=essay, order=2, content='Nights in the desert are cold.')
+        User.objects.create_superuser('admin', password='pw')
+
+    def test_csv_export_is_filtered_and_streamed(self):
+        import csv as csv_module
+
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('custom_admin:essay_export'), {
+            'status': 'completed', 'competition': self.competition.pk,
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv_module.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['username'] for row in rows], ['nomad0', 'nomad2'])
+        self.assertIn('score_topic', rows[0])
+
+    def test_gzipped_jsonl_with_text(self):
+        import gzip
+        import json
+
+        from .export import stream
+
+        data = gzip.decompress(b''.join(stream(Essay.objects.all(), 'jsonl', include_text=True,
+                                                compress=True, chunk_size=2)))
+        records = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[1]['status'], 'in_progress')
+        self.assertEqual(records[1]['text'], 'Sand dunes move with the wind 1.\n\nNights in the desert are cold.')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_superuser('admin', password='pw')
+        User.objects.create_user('taken')
+
+    def test_csv_import_creates_users_and_profiles(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from custom_admin import search
+
+        data = (
+            'username,email,password,status\n'
+            'ana,ana@school.test,secret-1,\n'
+            'taken,t@school.test,x,\n'
+            'ben,ben@school.test,secret-2,verified\n'
+            'cal,,,unknown\n'
+        ).encode()
+        self.client.login(username='admin', password='pw')
+        response = self.client.post(reverse('custom_admin:import_users'), {
+            'file': SimpleUploadedFile('users.csv', data, content_type='text/csv'), 'status': 'pending',
+        })
+        result = response.json()
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([(s['line'], s['reason']) for s in result['skipped']],
+                         [(3, 'username already exists'), (5, 'unknown status')])
+
+        statuses = dict(UserProfile.objects.filter(user__username__in=['ana', 'ben'])
+                        .values_list('user__username', 'status'))
+        self.assertEqual(statuses, {'ana': 'pending', 'ben': 'verified'})
+        self.assertTrue(User.objects.get(username='ana').check_password('secret-1'))
+        # bulk inserts bypass the signals; the import indexes them itself
+        found = User.objects.filter(search.user_filter('school.test')).values_list('username', flat=True)
+        self.assertEqual(sorted(found), ['ana', 'ben'])
+
+    def test_bulk_status_updates_profiles_and_cached_status(self):
+        from .verification import get_status
+
+        users = [User.objects.create_user(f'pupil{i}') for i in range(3)]
+        self.assertEqual(get_status(User.objects.get(pk=users[0].pk)), 'pending')  # now cached
+
+        self.client.login(username='admin', password='pw')
+        response = self.client.post(reverse('custom_admin:bulk_user_status'), {
+            'user_ids': ','.join(str(u.pk) for u in users[:2]), 'status': 'verified',
+        })
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(get_status(User.objects.get(pk=users[0].pk)), 'verified')
+        self.assertEqual(UserProfile.objects.get(user=users[2]).status, 'pending')
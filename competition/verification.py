@@ -0,0 +1,51 @@
+"""
+Verification status lookups for access checks.
+
+The status is read from the profile when it is already loaded (see
+``competition.backends.ProfileBackend``), otherwise from the cache, and
+only then from the database. ``competition.signals`` drops the cached
+value whenever a profile is saved or deleted.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .models import UserProfile
+
+NO_PROFILE = 'none'
+
+
+def cache_key(user_id):
+    return f'competition:verification_status:{user_id}'
+
+
+def status_ttl():
+    return getattr(settings, 'VERIFICATION_STATUS_TTL', 300)
+
+
+def get_status(user):
+    """
+    'pending', 'verified', 'rejected', or None without a profile
+    """
+    if not user.is_authenticated:
+        return None
+    if User.profile.is_cached(user):
+        profile = getattr(user, 'profile', None)
+        return profile.status if profile is not None else None
+
+    status = cache.get(cache_key(user.pk))
+    if status is None:
+        status = (
+            UserProfile.objects.filter(user_id=user.pk).values_list('status', flat=True).first()
+            or NO_PROFILE
+        )
+        cache.set(cache_key(user.pk), status, status_ttl())
+    return None if status == NO_PROFILE else status
+
+
+def invalidate_status(user_id):
+    cache.delete(cache_key(user_id))
+
+
+def invalidate_statuses(user_ids):
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
@@ -1,13 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django.db.models import Count, F
 from django.contrib.auth.models import User
-from .models import Competition, Essay, Paragraph, UserProfile
+from .models import Competition, Essay, LeaderboardEntry
 from .forms import ParagraphForm, CompetitionForm, UserStatusForm
 from .decorators import verified_user_required, admin_required
+from . import fragments
+from .stats import get_stats
+from .submissions import submit_paragraph
 
 
 def home(request):
@@ -91,14 +96,19 @@ def competition_list(request):
     """
     List all competitions for verified users
     """
-    competitions = Competition.objects.all()
+    competitions = fragments.competitions()
     
     # Get user's essays for each competition
-    user_essays = {essay.competition_id: essay for essay in Essay.objects.filter(user=request.user)}
+    user_essays = {
+        essay.competition_id: essay
+        for essay in Essay.objects.filter(user=request.user).only('id', 'competition_id', 'status')
+    }
     
     context = {
-        'competitions': competitions,
+        'cards': [(competition, user_essays.get(competition.pk)) for competition in competitions],
         'user_essays': user_essays,
+        'fragment_ttl': fragments.fragment_ttl(),
+        'fragment_version': fragments.list_version(),
     }
     
     return render(request, 'competition_list.html', context)
@@ -128,31 +138,24 @@ def essay_write(request, competition_id):
         messages.info(request, 'This essay is already completed and locked.')
         return redirect('essay_view', essay_id=essay.id)
     
-    # Check if max paragraphs reached
+    # Check if max paragraphs reached; submissions complete such essays
+    # under the essay row lock (see competition.submissions)
     current_count = essay.current_paragraph_count()
     if current_count >= competition.max_paragraphs:
-        # Auto-complete essay
-        essay.complete_essay()
-        messages.success(request, 'Your essay has been completed and submitted!')
+        messages.info(request, 'You have reached the maximum number of paragraphs.')
         return redirect('essay_view', essay_id=essay.id)
     
     if request.method == 'POST':
         form = ParagraphForm(request.POST)
         if form.is_valid():
-            # Double-check paragraph limit
-            if not essay.can_add_paragraph():
+            # One short transaction with the essay row locked (see competition.submissions)
+            essay, paragraph = submit_paragraph(essay.pk, competition.max_paragraphs, form.cleaned_data['content'])
+            if paragraph is None:
                 messages.error(request, 'You have reached the maximum number of paragraphs.')
                 return redirect('essay_view', essay_id=essay.id)
             
-            # Create paragraph
-            paragraph = form.save(commit=False)
-            paragraph.essay = essay
-            paragraph.order = current_count + 1
-            paragraph.save()
-            
             # Check if this was the last paragraph
-            if paragraph.order >= competition.max_paragraphs:
-                essay.complete_essay()
+            if essay.status == 'completed':
                 messages.success(request, 'Congratulations! Your essay has been completed and submitted!')
                 return redirect('essay_view', essay_id=essay.id)
             else:
@@ -193,6 +196,7 @@ def essay_view(request, essay_id):
     context = {
         'essay': essay,
         'paragraphs': paragraphs,
+        'scoring_status': essay.scoring_status(),
     }
     
     return render(request, 'essay_view.html', context)
@@ -200,35 +204,37 @@ def essay_view(request, essay_id):
 
 @login_required
 def leaderboard(request, competition_id):
-    competition = get_object_or_404(Competition, id=competition_id)
+    competition = fragments.get_competition(competition_id)
+    if competition is None:
+        raise Http404('No Competition matches the given query.')
 
     if not competition.has_ended():
         messages.error(request, 'Leaderboard will be available after the competition ends.')
         return redirect('competition_list')
 
-    essays = Essay.objects.filter(
-        competition=competition,
-        status__in=['completed', 'locked']
-    ).select_related('user')
-
-    if essays.exists():
-        # Step 2a: Calculate average time
-        valid_times = [
-            (e.completed_at - e.started_at).total_seconds()
-            for e in essays if e.completed_at and e.started_at
-        ]
-        avg_time_seconds = sum(valid_times)/len(valid_times) if valid_times else 1  # prevent div by zero
-
-        # Step 2b: Calculate final score for each essay
-        for essay in essays:
-            essay.calculate_final_score(avg_time_seconds)
-
-    # Step 2c: Order by final_score descending
-    essays = essays.order_by('-final_score')
+    # Shared rows come from the cache; only the user's own row is rendered here
+    board = fragments.leaderboard(competition, staff=request.user.is_staff)
+    rows = board['rows']
+    mine = None
+    index = board['users'].get(request.user.pk)
+    if index is not None:
+        if 'entries' in board:
+            mine = board['entries'][index]
+        else:
+            mine = (
+                LeaderboardEntry.objects
+                .select_related('essay__user')
+                .filter(competition=competition, essay__user=request.user)
+                .first()
+            )
+        if mine is not None:
+            rows = rows[:index] + [fragments.render_row(mine, mine=True)] + rows[index + 1:]
 
     context = {
         'competition': competition,
-        'essays': essays,
+        'board': board,
+        'rows': mark_safe(''.join(rows)),
+        'mine': mine,
     }
 
     return render(request, 'leaderboard.html', context)
@@ -240,29 +246,17 @@ def admin_dashboard(request):
     """
     Admin dashboard with statistics
     """
-    total_users = User.objects.count()
-    pending_users = UserProfile.objects.filter(status='pending').count()
-    verified_users = UserProfile.objects.filter(status='verified').count()
-    rejected_users = UserProfile.objects.filter(status='rejected').count()
-    
-    total_competitions = Competition.objects.count()
-    active_competitions = Competition.objects.filter(
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now()
-    ).count()
-    
-    total_essays = Essay.objects.count()
-    completed_essays = Essay.objects.filter(status__in=['completed', 'locked']).count()
+    stats = get_stats()
     
     context = {
-        'total_users': total_users,
-        'pending_users': pending_users,
-        'verified_users': verified_users,
-        'rejected_users': rejected_users,
-        'total_competitions': total_competitions,
-        'active_competitions': active_competitions,
-        'total_essays': total_essays,
-        'completed_essays': completed_essays,
+        'total_users': stats['users']['total'],
+        'pending_users': stats['users']['pending'],
+        'verified_users': stats['users']['verified'],
+        'rejected_users': stats['users']['rejected'],
+        'total_competitions': stats['competitions']['total'],
+        'active_competitions': stats['competitions']['active'],
+        'total_essays': stats['essays']['total'],
+        'completed_essays': stats['essays']['finished'],
     }
     
     return render(request, 'admin_dashboard.html', context)
@@ -5,3 +5,9 @@ class CustomAdminConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'custom_admin'
     verbose_name = 'Custom Admin Panel'
+
+    def ready(self):
+        """
+        Keep the admin search index in sync
+        """
+        import custom_admin.signals
@@ -0,0 +1,198 @@
+"""
+custom_admin/fulltext.py
+Full-text search over submitted paragraph text.
+
+Two backends share one interface:
+  * SQLite — an FTS5 table using competition_paragraph as external content
+    (the text is not duplicated), ranked with bm25() and highlighted with
+    snippet().
+  * PostgreSQL — to_tsvector/tsquery over Paragraph.content backed by a
+    GIN expression index, ranked with ts_rank and highlighted with
+    ts_headline.
+New paragraphs are indexed by custom_admin.signals.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+TABLE = 'custom_admin_paragraph_fts'
+PG_CONFIG = 'english'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Control characters can't appear in submitted text, so they make safe
+# highlight markers that survive HTML escaping
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def highlight(snippet):
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def parse_query(q):
+    """
+    Split a search box string into (terms, is_phrase). Wrapping the input
+    in double quotes searches for the exact phrase.
+    """
+    q = q.strip()
+    is_phrase = len(q) > 1 and q[0] == q[-1] == '"'
+    return WORD_RE.findall(q), is_phrase
+
+
+class SQLiteBackend:
+
+    def create(self, schema_connection=connection):
+        with schema_connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+                f"content, content='competition_paragraph', content_rowid='id', "
+                f"tokenize='porter unicode61')"
+            )
+
+    _available = False
+
+    def available(self):
+        # only a positive answer is cached: the table appears after migrate
+        if not SQLiteBackend._available:
+            SQLiteBackend._available = TABLE in connection.introspection.table_names()
+        return SQLiteBackend._available
+
+    def index(self, paragraphs):
+        rows = [(p.pk, p.content) for p in paragraphs]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {TABLE} (rowid, content) VALUES (%s, %s)', rows)
+
+    def remove(self, paragraphs):
+        # external-content tables need the old text to drop its tokens
+        rows = [(p.pk, p.content) for p in paragraphs]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} ({TABLE}, rowid, content) VALUES ('delete', %s, %s)", rows,
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('delete-all')")
+
+    def search(self, terms, is_phrase, limit):
+        quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+        match = ' + '.join(quoted) if is_phrase else ' '.join(quoted)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT p.id, p.essay_id, p.\"order\", "
+                f"snippet({TABLE}, 0, %s, %s, '…', 16), bm25({TABLE}) "
+                f"FROM {TABLE} JOIN competition_paragraph p ON p.id = {TABLE}.rowid "
+                f"WHERE {TABLE} MATCH %s ORDER BY bm25({TABLE}) LIMIT %s",
+                [MARK_START, MARK_END, match, limit],
+            )
+            # bm25() is lower-is-better; flip it so higher scores rank first
+            return [(pid, eid, order, snippet, -score) for pid, eid, order, snippet, score in cursor.fetchall()]
+
+
+class PostgresBackend:
+
+    def create(self, schema_connection=connection):
+        with schema_connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS paragraph_content_fts_idx ON competition_paragraph "
+                f"USING gin (to_tsvector('{PG_CONFIG}', content))"
+            )
+
+    def available(self):
+        return True
+
+    def index(self, paragraphs):
+        pass  # the expression index is maintained by PostgreSQL
+
+    def remove(self, paragraphs):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, terms, is_phrase, limit):
+        query_fn = 'phraseto_tsquery' if is_phrase else 'plainto_tsquery'
+        options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=32, MinWords=12'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, essay_id, \"order\", "
+                f"ts_headline('{PG_CONFIG}', content, q, %s), "
+                f"ts_rank(to_tsvector('{PG_CONFIG}', content), q) AS rank "
+                f"FROM competition_paragraph, {query_fn}('{PG_CONFIG}', %s) q "
+                f"WHERE to_tsvector('{PG_CONFIG}', content) @@ q "
+                f"ORDER BY rank DESC LIMIT %s",
+                [options, ' '.join(terms), limit],
+            )
+            return cursor.fetchall()
+
+
+def get_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    if vendor == 'sqlite':
+        return SQLiteBackend()
+    if vendor == 'postgresql':
+        return PostgresBackend()
+    return None
+
+
+def search_available():
+    backend = get_backend()
+    return backend is not None and backend.available()
+
+
+def index_paragraphs(paragraphs):
+    backend = get_backend()
+    if backend is not None and backend.available():
+        backend.index(paragraphs)
+
+
+def unindex_paragraphs(paragraphs):
+    backend = get_backend()
+    if backend is not None and backend.available():
+        backend.remove(paragraphs)
+
+
+def search_essays(q, limit=20):
+    """
+    Essays whose text matches ``q``, best first, each with the snippet of
+    its best-matching paragraph: [(essay_id, paragraph_order, html, score)]
+    """
+    terms, is_phrase = parse_query(q)
+    backend = get_backend()
+    if not terms or backend is None or not backend.available():
+        return []
+
+    best = {}
+    # several paragraphs of one essay may match; over-fetch, keep the best
+    for _, essay_id, order, snippet, score in backend.search(terms, is_phrase, limit * 5):
+        if essay_id not in best:
+            best[essay_id] = (essay_id, order, highlight(snippet), float(score))
+        if len(best) >= limit:
+            break
+    return list(best.values())
+
+
+def rebuild(chunk_size=2000):
+    """
+    Re-index all paragraphs, streaming them in chunks. Returns the count.
+    """
+    from competition.models import Paragraph
+
+    backend = get_backend()
+    if backend is None or not backend.available():
+        return 0
+    backend.clear()
+
+    total = 0
+    batch = []
+    for paragraph in Paragraph.objects.only('content').iterator(chunk_size=chunk_size):
+        batch.append(paragraph)
+        if len(batch) >= chunk_size:
+            backend.index(batch)
+            total += len(batch)
+            batch = []
+    backend.index(batch)
+    return total + len(batch)
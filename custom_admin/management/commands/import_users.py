@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from custom_admin import user_import
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users from a CSV file with the columns username, email, password, '
+        'first_name, last_name and status (all but username optional)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--status', choices=user_import.STATUSES, default='pending',
+                            help='Status of users whose row has none')
+        parser.add_argument('--workers', type=int, help='Password hashing threads (default USER_IMPORT_HASH_WORKERS)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with open(options['path'], encoding='utf-8-sig', newline='') as fh:
+            result = user_import.import_users(
+                user_import.read_rows(fh), default_status=options['status'], workers=options['workers'],
+            )
+
+        for line, username, reason in result.skipped:
+            self.stdout.write(self.style.WARNING(f'line {line}: skipped {username or "(blank)"}: {reason}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created} users in {time.perf_counter() - started:.1f}s '
+            f'({len(result.skipped)} skipped)'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from custom_admin import fulltext
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text index of essay paragraphs, streaming rows in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not fulltext.search_available():
+            self.stdout.write('Full-text search is not available on this database.')
+            return
+        total = fulltext.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} paragraphs'))
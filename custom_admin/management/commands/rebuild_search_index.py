@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from custom_admin import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the admin search index (after bulk imports that bypass signals)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not search.search_available():
+            self.stdout.write('Search index not available on this database; icontains is used instead.')
+            return
+        total = search.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} rows'))
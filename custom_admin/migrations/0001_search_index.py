@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import OperationalError, migrations
+
+
+def create_search_index(apps, schema_editor):
+    from custom_admin import search
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return  # other databases fall back to icontains filtering
+    try:
+        search.create_table(schema_editor.connection)
+    except OperationalError:
+        return  # SQLite built without FTS5/trigram: icontains fallback
+
+    User = apps.get_model('auth', 'User')
+    Competition = apps.get_model('competition', 'Competition')
+    with schema_editor.connection.cursor() as cursor:
+        for user in User.objects.only('username', 'email').iterator(chunk_size=2000):
+            cursor.execute(
+                f'INSERT INTO {search.TABLE} (kind, obj_id, body) VALUES (%s, %s, %s)',
+                ['user', user.pk, f'{user.username} {user.email}'],
+            )
+        for competition in Competition.objects.only('title').iterator(chunk_size=2000):
+            cursor.execute(
+                f'INSERT INTO {search.TABLE} (kind, obj_id, body) VALUES (%s, %s, %s)',
+                ['competition', competition.pk, competition.title],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    from custom_admin import search
+
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {search.TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0009_admin_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
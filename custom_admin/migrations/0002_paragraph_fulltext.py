@@ -0,0 +1,38 @@
+from django.db import OperationalError, migrations
+
+
+def create_fulltext_index(apps, schema_editor):
+    from custom_admin import fulltext
+
+    backend = fulltext.get_backend(schema_editor.connection.vendor)
+    if backend is None:
+        return
+    try:
+        backend.create(schema_editor.connection)
+    except OperationalError:
+        return  # SQLite built without FTS5: essay text search is disabled
+
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {fulltext.TABLE} ({fulltext.TABLE}) VALUES ('rebuild')")
+
+
+def drop_fulltext_index(apps, schema_editor):
+    from custom_admin import fulltext
+
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {fulltext.TABLE}')
+        elif schema_editor.connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS paragraph_content_fts_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_admin', '0001_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
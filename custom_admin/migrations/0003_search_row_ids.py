@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def rekey_search_rows(apps, schema_editor):
+    """
+    Move existing rows to the rowids derived from kind and object id, so
+    they can be deleted by rowid
+    """
+    from custom_admin import search
+
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or search.TABLE not in connection.introspection.table_names():
+        return
+    codes = ' '.join(f"WHEN '{kind}' THEN {code}" for kind, code in search.KINDS.items())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE search_rekey AS '
+            f'SELECT kind, obj_id, MAX(body) AS body FROM {search.TABLE} GROUP BY kind, obj_id'
+        )
+        cursor.execute(f'DELETE FROM {search.TABLE}')
+        cursor.execute(
+            f'INSERT INTO {search.TABLE} (rowid, kind, obj_id, body) '
+            f'SELECT obj_id * {len(search.KINDS)} + CASE kind {codes} END, kind, obj_id, body '
+            f'FROM search_rekey WHERE kind IN ({", ".join(repr(kind) for kind in search.KINDS)})'
+        )
+        cursor.execute('DROP TABLE search_rekey')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_admin', '0002_paragraph_fulltext'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_search_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,108 @@
+"""
+custom_admin/pagination.py
+Keyset (cursor) pagination for the admin list pages.
+
+Pages are addressed by the (timestamp, id) of the row at their edge rather
+than by OFFSET, so deep pages cost the same as the first one. Totals come
+from a short-lived cached COUNT.
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Return (datetime, pk) or None for a missing/garbled cursor
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        value = parse_datetime(value)
+    except (ValueError, TypeError):
+        return None
+    if value is None or not isinstance(pk, int):
+        return None
+    return value, pk
+
+
+class CursorPage:
+    def __init__(self, object_list, field, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = self._cursor(object_list[-1], field) if object_list and has_next else None
+        self.previous_cursor = self._cursor(object_list[0], field) if object_list and has_previous else None
+
+    @staticmethod
+    def _cursor(obj, field):
+        return encode_cursor(getattr(obj, field), obj.pk)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Newest-first pagination over ``field`` with ``id`` as tie-breaker
+    """
+
+    def __init__(self, queryset, field, per_page=20):
+        self.queryset = queryset
+        self.field = field
+        self.per_page = per_page
+
+    def page(self, after=None, before=None):
+        after, before = decode_cursor(after), decode_cursor(before)
+        field = self.field
+
+        if before is not None:
+            value, pk = before
+            qs = (
+                self.queryset
+                .filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+                .order_by(field, 'pk')
+            )
+            rows = list(qs[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(rows, field, has_next=True, has_previous=has_previous)
+
+        qs = self.queryset.order_by(f'-{field}', '-pk')
+        if after is not None:
+            value, pk = after
+            qs = qs.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+        rows = list(qs[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], field, has_next=has_next, has_previous=after is not None)
+
+
+def cached_count(queryset):
+    """
+    COUNT(*) of a filtered queryset, cached for ADMIN_COUNT_CACHE_TTL seconds.
+    Good enough for the "N results" label; never used for navigation.
+    """
+    key = 'custom_admin:count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'ADMIN_COUNT_CACHE_TTL', 60))
+    return count
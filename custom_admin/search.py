@@ -0,0 +1,148 @@
+"""
+custom_admin/search.py
+Indexed search for the admin list filters.
+
+On SQLite the usernames, emails and competition titles are mirrored into
+an FTS5 table with the trigram tokenizer, which answers the same
+"contains" searches as LIKE '%q%' from an index. The table is kept up to
+date by custom_admin.signals; other databases fall back to icontains.
+
+Each row's rowid is derived from its kind and object id (see ``row_id``),
+so updates and deletes address a row by its primary key instead of
+scanning the UNINDEXED kind/obj_id columns.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLE = 'custom_admin_search'
+
+# The trigram tokenizer can't match needles shorter than three characters
+MIN_QUERY_LENGTH = 3
+
+# kind -> code mixed into the rowid; append new kinds, never renumber
+KINDS = {'user': 0, 'competition': 1}
+
+_available = False
+
+
+def create_table(schema_connection=connection):
+    with schema_connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+            f"USING fts5(kind UNINDEXED, obj_id UNINDEXED, body, tokenize='trigram')"
+        )
+
+
+def search_available():
+    global _available
+    if connection.vendor != 'sqlite':
+        return False
+    if not _available:
+        # only a positive answer is cached: the table appears after migrate
+        _available = TABLE in connection.introspection.table_names()
+    return _available
+
+
+def row_id(kind, obj_id):
+    return int(obj_id) * len(KINDS) + KINDS[kind]
+
+
+def _match_expression(q):
+    # a quoted FTS5 string is matched as a literal substring
+    return '"' + q.replace('"', '""') + '"'
+
+
+def _use_index(q):
+    return search_available() and len(q) >= MIN_QUERY_LENGTH
+
+
+def _matching_ids(kind, q):
+    return RawSQL(
+        f'SELECT obj_id FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s',
+        [f'body : {_match_expression(q)}', kind],
+    )
+
+
+def user_filter(q, prefix=''):
+    """
+    Q object matching users whose username or email contains ``q``.
+    ``prefix`` is the lookup path to the user (e.g. 'user__').
+    """
+    if _use_index(q):
+        return Q(**{f'{prefix}pk__in': _matching_ids('user', q)})
+    return Q(**{f'{prefix}username__icontains': q}) | Q(**{f'{prefix}email__icontains': q})
+
+
+def competition_filter(q, prefix=''):
+    """
+    Q object matching competitions whose title contains ``q``
+    """
+    if _use_index(q):
+        return Q(**{f'{prefix}pk__in': _matching_ids('competition', q)})
+    return Q(**{f'{prefix}title__icontains': q})
+
+
+# ─────────────────────────────────────────────────────────────────
+# INDEX MAINTENANCE
+# ─────────────────────────────────────────────────────────────────
+
+def _replace(kind, rows, created=False):
+    """
+    rows: iterable of (obj_id, body). ``created`` objects have no row to
+    delete yet.
+    """
+    rows = list(rows)
+    if not rows or not search_available():
+        return
+    with connection.cursor() as cursor:
+        if not created:
+            cursor.executemany(
+                f'DELETE FROM {TABLE} WHERE rowid = %s',
+                [(row_id(kind, obj_id),) for obj_id, _ in rows],
+            )
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, kind, obj_id, body) VALUES (%s, %s, %s, %s)',
+            [(row_id(kind, obj_id), kind, obj_id, body) for obj_id, body in rows],
+        )
+
+
+def index_users(users, created=False):
+    _replace('user', ((u.pk, f'{u.username} {u.email}') for u in users), created)
+
+
+def index_competitions(competitions, created=False):
+    _replace('competition', ((c.pk, c.title) for c in competitions), created)
+
+
+def remove(kind, obj_id):
+    if search_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [row_id(kind, obj_id)])
+
+
+def rebuild(chunk_size=2000):
+    """
+    Re-index everything, streaming rows in chunks. Returns rows indexed.
+    """
+    from django.contrib.auth.models import User
+    from competition.models import Competition
+
+    if not search_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+    total = 0
+    for model, index in ((User, index_users), (Competition, index_competitions)):
+        fields = ['username', 'email'] if model is User else ['title']
+        batch = []
+        for obj in model.objects.only(*fields).iterator(chunk_size=chunk_size):
+            batch.append(obj)
+            if len(batch) >= chunk_size:
+                index(batch, created=True)
+                total += len(batch)
+                batch = []
+        index(batch, created=True)
+        total += len(batch)
+    return total
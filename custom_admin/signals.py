@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from competition.models import Competition, Paragraph
+
+from . import fulltext, search
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keep the admin search index in sync; logins only touch last_login
+    """
+    if update_fields is not None and not {'username', 'email'} & set(update_fields):
+        return
+    search.index_users([instance], created)
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    search.remove('user', instance.pk)
+
+
+@receiver(post_save, sender=Competition)
+def index_competition(sender, instance, created, **kwargs):
+    search.index_competitions([instance], created)
+
+
+@receiver(post_delete, sender=Competition)
+def unindex_competition(sender, instance, **kwargs):
+    search.remove('competition', instance.pk)
+
+
+@receiver(post_save, sender=Paragraph)
+def index_paragraph(sender, instance, created, **kwargs):
+    """
+    Paragraph text never changes after it is written, so index on create
+    """
+    if created:
+        fulltext.index_paragraphs([instance])
+
+
+@receiver(post_delete, sender=Paragraph)
+def unindex_paragraph(sender, instance, **kwargs):
+    fulltext.unindex_paragraphs([instance])
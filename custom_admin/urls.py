@@ -8,11 +8,16 @@ urlpatterns = [
     path('',                       views.dashboard,          name='dashboard'),
     path('users/',                 views.users,              name='users'),
     path('essays/',                views.essays,             name='essays'),
+    path('essays/export/',         views.essay_export,       name='essay_export'),
     path('competitions/create/',   views.create_competition, name='create_competition'),
 
     # AJAX endpoints
     path('ajax/user/status/',      views.update_user_status, name='update_user_status'),
+    path('ajax/user/bulk-status/', views.bulk_user_status,   name='bulk_user_status'),
+    path('ajax/user/import/',      views.import_users,       name='import_users'),
     path('ajax/user/delete/',      views.delete_user,        name='delete_user'),
     path('ajax/essay/action/',     views.essay_action,       name='essay_action'),
     path('ajax/essay/<int:essay_id>/detail/', views.essay_detail, name='essay_detail'),
+    path('ajax/essay/search/',     views.essay_search,       name='essay_search'),
+    path('ajax/essay/<int:essay_id>/similar/', views.essay_similar, name='essay_similar'),
 ]
@@ -0,0 +1,133 @@
+"""
+Bulk creation of user accounts from CSV (``manage.py import_users`` and
+the custom admin import).
+
+Rows are inserted with ``bulk_create`` in batches, so the per-user
+``post_save`` receivers do not run; their work is done here in bulk
+instead: profiles are created with their status, the admin search index
+is updated and the dashboard counts are invalidated once. Passwords are
+hashed in a thread pool: the hashers (PBKDF2, bcrypt, Argon2) release the
+GIL while they work.
+"""
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from competition.models import UserProfile
+from competition.stats import invalidate_stats
+
+from . import search
+
+STATUSES = ('pending', 'verified', 'rejected')
+FIELDS = ('username', 'email', 'password', 'first_name', 'last_name', 'status')
+
+
+def batch_size():
+    return getattr(settings, 'USER_IMPORT_BATCH_SIZE', 500)
+
+
+def hash_workers():
+    return getattr(settings, 'USER_IMPORT_HASH_WORKERS', 4)
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    # (line number, username, reason)
+    skipped: list = field(default_factory=list)
+
+
+def read_rows(source):
+    """
+    (line number, row dict) for each CSV row; ``source`` is a text file
+    or uploaded (binary) file with a header naming some of FIELDS
+    """
+    if not isinstance(source, io.TextIOBase):
+        source = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    for line, row in enumerate(csv.DictReader(source), start=2):
+        yield line, {name: (row.get(name) or '').strip() for name in FIELDS}
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hashes in input order; empty passwords become unusable ones
+    """
+    workers = workers or hash_workers()
+    hash_one = lambda password: make_password(password or None)
+    if workers <= 1:
+        return [hash_one(password) for password in passwords]
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(hash_one, passwords))
+
+
+def validate(batch, default_status, seen, result):
+    """
+    Rows of ``batch`` that can be created; the others are recorded in
+    ``result.skipped``
+    """
+    existing = set(
+        User.objects.filter(username__in=[row['username'] for _, row in batch])
+        .values_list('username', flat=True)
+    )
+    valid = []
+    for line, row in batch:
+        username = row['username']
+        row['status'] = row['status'] or default_status
+        if not username:
+            reason = 'missing username'
+        elif len(username) > User._meta.get_field('username').max_length:
+            reason = 'username too long'
+        elif username in existing or username in seen:
+            reason = 'username already exists'
+        elif row['status'] not in STATUSES:
+            reason = 'unknown status'
+        else:
+            seen.add(username)
+            valid.append(row)
+            continue
+        result.skipped.append((line, username, reason))
+    return valid
+
+
+def create_batch(batch, default_status, seen, result, workers=None):
+    rows = validate(batch, default_status, seen, result)
+    passwords = hash_passwords([row['password'] for row in rows], workers)
+    users = User.objects.bulk_create([
+        User(
+            username=row['username'], email=row['email'], password=password,
+            first_name=row['first_name'], last_name=row['last_name'],
+        )
+        for row, password in zip(rows, passwords)
+    ])
+    UserProfile.objects.bulk_create([
+        UserProfile(user=user, status=row['status']) for user, row in zip(users, rows)
+    ])
+    search.index_users(users, created=True)  # fresh rows: nothing to delete
+    result.created += len(users)
+
+
+def import_users(rows, default_status='pending', workers=None):
+    """
+    Create users from (line number, row) pairs, all or nothing. Returns
+    an ImportResult.
+    """
+    result = ImportResult()
+    seen = set()
+    size = batch_size()
+    with transaction.atomic():
+        batch = []
+        for item in rows:
+            batch.append(item)
+            if len(batch) >= size:
+                create_batch(batch, default_status, seen, result, workers)
+                batch = []
+        if batch:
+            create_batch(batch, default_status, seen, result, workers)
+    invalidate_stats()
+    return result
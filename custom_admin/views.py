@@ -3,21 +3,36 @@ custom_admin/views.py
 Uses: competition.models (UserProfile related_name='profile',
       Essay related_name='paragraphs', Essay.started_at, Essay.completed_at)
 """
+import csv
 import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.db.models import Q, Count
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
+from competition import duplicates, export
+from competition.ai import vector_index
 from competition.models import Competition, Essay, Paragraph, UserProfile
 from competition.forms import CompetitionForm
+from competition.stats import get_stats, invalidate_stats
+from competition.verification import invalidate_statuses
 
+from . import fulltext, search, user_import
 from .decorators import admin_required
+from .pagination import CursorPaginator, cached_count
+
+
+def filter_query(request):
+    """Current filters as a query string, without the page cursor."""
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    return params.urlencode()
 
 
 # ─────────────────────────────────────────────────────────────────
@@ -29,57 +44,28 @@ from .decorators import admin_required
 def dashboard(request):
     now = timezone.now()
 
-    # Stat counts
-    total_users    = User.objects.count()
-    pending_users  = UserProfile.objects.filter(status='pending').count()
-    verified_users = UserProfile.objects.filter(status='verified').count()
-    rejected_users = UserProfile.objects.filter(status='rejected').count()
+    # Stat counts — one aggregate query per table, cached briefly
+    stats = get_stats()
+    user_counts  = stats['users']
+    comp_counts  = stats['competitions']
+    essay_counts = stats['essays']
 
-    total_competitions   = Competition.objects.count()
-    active_competitions  = Competition.objects.filter(
-        start_date__lte=now, end_date__gte=now
-    ).count()
-    overdue_competitions = Competition.objects.filter(end_date__lt=now)
-
-    total_essays       = Essay.objects.count()
-    completed_essays   = Essay.objects.filter(status__in=['completed', 'locked']).count()
-    in_progress_essays = Essay.objects.filter(status='in_progress').count()
-    locked_essays      = Essay.objects.filter(status='locked').count()
-    pure_completed     = Essay.objects.filter(status='completed').count()
+    overdue_competitions = Competition.objects.filter(end_date__lt=now).only('title')[:3]
 
     # Chart data — user status bar chart
     user_chart_data = json.dumps({
         'labels': ['Pending', 'Verified', 'Rejected'],
-        'values': [pending_users, verified_users, rejected_users],
+        'values': [user_counts['pending'], user_counts['verified'], user_counts['rejected']],
     })
 
     # Chart data — essay status doughnut
     essay_chart_data = json.dumps({
         'labels': ['In Progress', 'Completed', 'Locked'],
-        'values': [in_progress_essays, pure_completed, locked_essays],
+        'values': [essay_counts['in_progress'], essay_counts['completed'], essay_counts['locked']],
     })
 
-    # Chart data — competitions per month (last 12 months)
-    # Uses Competition.created_at which exists on your model
-    comp_months = []
-    comp_counts = []
-    for i in range(11, -1, -1):
-        # Build month boundaries without dateutil dependency
-        month = (now.month - i - 1) % 12 + 1
-        year  = now.year + ((now.month - i - 1) // 12)
-        from django.utils.timezone import datetime
-        import calendar
-        month_start = now.replace(year=year, month=month, day=1,
-                                  hour=0, minute=0, second=0, microsecond=0)
-        last_day = calendar.monthrange(year, month)[1]
-        month_end = month_start.replace(day=last_day, hour=23, minute=59, second=59)
-        count = Competition.objects.filter(
-            created_at__gte=month_start, created_at__lte=month_end
-        ).count()
-        comp_months.append(month_start.strftime('%b %Y'))
-        comp_counts.append(count)
-
-    comp_chart_data = json.dumps({'labels': comp_months, 'values': comp_counts})
+    # Chart data — competitions per month (last 12 months), by Competition.created_at
+    comp_chart_data = json.dumps(stats['competitions_per_month'])
 
     # Top 5 users by completed essays
     top_users = (
@@ -101,17 +87,18 @@ def dashboard(request):
     )
 
     context = {
-        'total_users':          total_users,
-        'pending_users':        pending_users,
-        'verified_users':       verified_users,
-        'rejected_users':       rejected_users,
-        'total_competitions':   total_competitions,
-        'active_competitions':  active_competitions,
-        'total_essays':         total_essays,
-        'completed_essays':     completed_essays,
+        'total_users':          user_counts['total'],
+        'pending_users':        user_counts['pending'],
+        'verified_users':       user_counts['verified'],
+        'rejected_users':       user_counts['rejected'],
+        'total_competitions':   comp_counts['total'],
+        'active_competitions':  comp_counts['active'],
+        'total_essays':         essay_counts['total'],
+        'completed_essays':     essay_counts['finished'],
         'user_chart_data':      user_chart_data,
         'essay_chart_data':     essay_chart_data,
         'comp_chart_data':      comp_chart_data,
+        'overdue_count':        comp_counts['overdue'],
         'overdue_competitions': overdue_competitions,
         'top_users':            top_users,
         'recent_essays':        recent_essays,
@@ -126,24 +113,29 @@ def dashboard(request):
 @login_required
 @admin_required
 def users(request):
-    qs = User.objects.select_related('profile').order_by('-date_joined')
+    qs = (
+        User.objects
+        .select_related('profile')
+        .only('username', 'email', 'date_joined', 'is_staff', 'profile__status')
+    )
 
     q      = request.GET.get('q', '').strip()
     status = request.GET.get('status', '').strip()
 
     if q:
-        qs = qs.filter(Q(username__icontains=q) | Q(email__icontains=q))
+        qs = qs.filter(search.user_filter(q))
     if status in ('pending', 'verified', 'rejected'):
         qs = qs.filter(profile__status=status)
 
-    paginator  = Paginator(qs, 20)
-    users_page = paginator.get_page(request.GET.get('page', 1))
+    paginator  = CursorPaginator(qs, 'date_joined', per_page=20)
+    users_page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
 
     return render(request, 'custom_admin/users.html', {
         'users':         users_page,
         'search_query':  q,
         'status_filter': status,
-        'total_count':   paginator.count,
+        'filter_query':  filter_query(request),
+        'total_count':   cached_count(qs),
     })
 
 
@@ -166,6 +158,53 @@ def update_user_status(request):
     return JsonResponse({'ok': True, 'status': new_status, 'username': user.username})
 
 
+@login_required
+@admin_required
+@require_POST
+def bulk_user_status(request):
+    """AJAX — set the status of many users with one UPDATE."""
+    new_status = request.POST.get('status')
+    user_ids   = [int(pk) for pk in request.POST.get('user_ids', '').split(',') if pk.strip().isdigit()]
+
+    if new_status not in ('pending', 'verified', 'rejected'):
+        return JsonResponse({'ok': False, 'error': 'Invalid status.'}, status=400)
+    if not user_ids:
+        return JsonResponse({'ok': False, 'error': 'No users selected.'}, status=400)
+
+    # a queryset update sends no post_save, so drop the caches here
+    updated = UserProfile.objects.filter(user_id__in=user_ids).update(status=new_status, updated_at=timezone.now())
+    invalidate_statuses(user_ids)
+    invalidate_stats()
+
+    return JsonResponse({'ok': True, 'status': new_status, 'updated': updated, 'user_ids': user_ids})
+
+
+@login_required
+@admin_required
+@require_POST
+def import_users(request):
+    """AJAX — create users from an uploaded CSV file."""
+    upload = request.FILES.get('file')
+    status = request.POST.get('status') or 'pending'
+
+    if upload is None:
+        return JsonResponse({'ok': False, 'error': 'No file uploaded.'}, status=400)
+    if status not in user_import.STATUSES:
+        return JsonResponse({'ok': False, 'error': 'Invalid status.'}, status=400)
+
+    try:
+        result = user_import.import_users(user_import.read_rows(upload), default_status=status)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        return JsonResponse({'ok': False, 'error': f'Could not read the CSV file: {exc}'}, status=400)
+
+    return JsonResponse({
+        'ok': True,
+        'created': result.created,
+        'skipped': [{'line': line, 'username': username, 'reason': reason}
+                    for line, username, reason in result.skipped],
+    })
+
+
 @login_required
 @admin_required
 @require_POST
@@ -187,8 +226,12 @@ def essays(request):
     qs = (
         Essay.objects
         .select_related('user', 'competition')
-        .prefetch_related('paragraphs')   # related_name='paragraphs'
-        .order_by('-started_at')          # Essay.started_at field
+        # only the columns the table shows — no paragraph text
+        .only(
+            'status', 'paragraph_count', 'word_count', 'final_score',
+            'started_at', 'completed_at',
+            'user__username', 'competition__title', 'competition__max_paragraphs',
+        )
     )
 
     q           = request.GET.get('q', '').strip()
@@ -196,22 +239,18 @@ def essays(request):
     comp_filter = request.GET.get('competition', '').strip()
 
     if q:
-        qs = qs.filter(user__username__icontains=q)
+        qs = qs.filter(search.user_filter(q, 'user__') | search.competition_filter(q, 'competition__'))
     if status in ('in_progress', 'completed', 'locked'):
         qs = qs.filter(status=status)
     if comp_filter.isdigit():
         qs = qs.filter(competition__pk=int(comp_filter))
 
-    paginator   = Paginator(qs, 20)
-    essays_page = paginator.get_page(request.GET.get('page', 1))
+    paginator   = CursorPaginator(qs, 'started_at', per_page=20)
+    essays_page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
 
-    competitions = Competition.objects.order_by('title')
+    competitions = Competition.objects.only('title').order_by('title')
 
-    summary = {
-        'in_progress': Essay.objects.filter(status='in_progress').count(),
-        'completed':   Essay.objects.filter(status='completed').count(),
-        'locked':      Essay.objects.filter(status='locked').count(),
-    }
+    summary = get_stats()['essays']
 
     return render(request, 'custom_admin/essays.html', {
         'essays':        essays_page,
@@ -219,11 +258,41 @@ def essays(request):
         'search_query':  q,
         'status_filter': status,
         'comp_filter':   comp_filter,
-        'total_count':   paginator.count,
+        'filter_query':  filter_query(request),
+        'total_count':   cached_count(qs),
         'summary':       summary,
     })
 
 
+@login_required
+@admin_required
+def essay_export(request):
+    """Stream the filtered essays as CSV or JSON Lines (optionally gzipped)."""
+    fmt         = request.GET.get('format', 'csv')
+    q           = request.GET.get('q', '').strip()
+    status      = request.GET.get('status', '').strip()
+    comp_filter = request.GET.get('competition', '').strip()
+    include_text = request.GET.get('text') == '1'
+    compress     = request.GET.get('gzip') == '1'
+
+    if fmt not in export.FORMATS:
+        return JsonResponse({'ok': False, 'error': 'Unknown format.'}, status=400)
+
+    qs = export.essays_queryset(
+        competition_ids=[int(comp_filter)] if comp_filter.isdigit() else None,
+        statuses=[status] if status in ('in_progress', 'completed', 'locked') else None,
+    )
+    if q:
+        qs = qs.filter(search.user_filter(q, 'user__') | search.competition_filter(q, 'competition__'))
+
+    response = StreamingHttpResponse(
+        export.stream(qs, fmt, include_text=include_text, compress=compress),
+        content_type=export.content_type(fmt, compress),
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(fmt, compress)}"'
+    return response
+
+
 @login_required
 @admin_required
 @require_POST
@@ -260,10 +329,19 @@ def essay_detail(request, essay_id):
         .prefetch_related('paragraphs'),
         pk=essay_id,
     )
-    # paragraphs uses related_name='paragraphs'
+    # paragraphs uses related_name='paragraphs' (ordered by 'order')
     paragraphs = [
         {'order': p.order, 'content': p.content}
-        for p in essay.paragraphs.order_by('order')
+        for p in essay.paragraphs.all()
+    ]
+    similar = [
+        {
+            'essay_id':   other.essay_id,
+            'username':   other.essay.user.username,
+            'similarity': round(similarity, 3),
+            'detail_url': reverse('custom_admin:essay_detail', args=[other.essay_id]),
+        }
+        for other, similarity in duplicates.find_similar(essay)
     ]
     return JsonResponse({
         'id':              essay.pk,
@@ -278,9 +356,67 @@ def essay_detail(request, essay_id):
         'started_at':      essay.started_at.strftime('%b %d, %Y %H:%M') if essay.started_at else None,
         'completed_at':    essay.completed_at.strftime('%b %d, %Y %H:%M') if essay.completed_at else None,
         'paragraphs':      paragraphs,
+        'similar_essays':  similar,
+        'similar_url':     reverse('custom_admin:essay_similar', args=[essay.pk]),
     })
 
 
+@login_required
+@admin_required
+def essay_similar(request, essay_id):
+    """AJAX GET — essays of the same competition closest in meaning."""
+    essay = get_object_or_404(Essay.objects.only('competition_id'), pk=essay_id)
+    hits = vector_index.similar_essays(essay, k=10)
+    essays = Essay.objects.select_related('user').only('user__username').in_bulk(
+        [other_id for other_id, _ in hits]
+    )
+    threshold = vector_index.paraphrase_threshold()
+    results = [
+        {
+            'essay_id':   other_id,
+            'username':   essays[other_id].user.username,
+            'similarity': round(similarity, 3),
+            'paraphrase': similarity >= threshold,
+            'detail_url': reverse('custom_admin:essay_detail', args=[other_id]),
+        }
+        for other_id, similarity in hits
+        if other_id in essays
+    ]
+    return JsonResponse({'ok': True, 'results': results})
+
+
+@login_required
+@admin_required
+def essay_search(request):
+    """AJAX GET — ranked full-text search over essay paragraphs."""
+    q = request.GET.get('q', '').strip()
+    if not q:
+        return JsonResponse({'ok': False, 'error': 'Enter a word or "a phrase".'}, status=400)
+    if not fulltext.search_available():
+        return JsonResponse({'ok': False, 'error': 'Essay search is not available.'}, status=503)
+
+    hits = fulltext.search_essays(q, limit=20)
+    essays = Essay.objects.select_related('user', 'competition').only(
+        'status', 'user__username', 'competition__title',
+    ).in_bulk([essay_id for essay_id, _, _, _ in hits])
+
+    results = [
+        {
+            'essay_id':    essay_id,
+            'username':    essays[essay_id].user.username,
+            'competition': essays[essay_id].competition.title,
+            'status':      essays[essay_id].status,
+            'paragraph':   order,
+            'snippet':     snippet,
+            'score':       round(score, 4),
+            'detail_url':  reverse('custom_admin:essay_detail', args=[essay_id]),
+        }
+        for essay_id, order, snippet, score in hits
+        if essay_id in essays
+    ]
+    return JsonResponse({'ok': True, 'query': q, 'results': results})
+
+
 # ─────────────────────────────────────────────────────────────────
 # CREATE COMPETITION
 # ─────────────────────────────────────────────────────────────────
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'competition.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +67,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL lets pages keep reading while an essay is being submitted;
+            # it is stored in the database file, so deployments switch it on
+            # once with ``manage.py enable_wal`` (connections then relax
+            # synchronous to NORMAL, see competition.signals)
+            # take the write lock at BEGIN so concurrent submissions queue on
+            # the busy timeout instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -107,7 +118,120 @@ STATICFILES_DIRS = [
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Loads request.user together with its profile (see competition.backends).
+# ModelBackend stays listed so sessions logged in before ProfileBackend
+# existed (which store its path) remain valid.
+AUTHENTICATION_BACKENDS = [
+    'competition.backends.ProfileBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Seconds a user's verification status is cached (see competition.verification)
+VERIFICATION_STATUS_TTL = 300
+
 # Login URL
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
-LOGOUT_REDIRECT_URL = 'home'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'home'
+
+# Background essay scoring (manage.py scoring_worker)
+SCORING_WORKER_CONCURRENCY = 2
+SCORING_MAX_ATTEMPTS = 3
+SCORING_RETRY_DELAY = 30      # seconds, multiplied by the attempt number
+SCORING_STALE_AFTER = 600     # seconds before a 'running' job is reclaimed
+SCORING_LEADERBOARD_INTERVAL = 30   # max seconds between ranking rebuilds while busy
+
+# Competition deadline scheduler (manage.py run_scheduler)
+SCHEDULER_INTERVAL = 60          # seconds between passes with --loop
+SCHEDULER_ENQUEUE_BATCH = 500    # scoring jobs inserted per query
+SCHEDULER_WARM_WINDOW = 86400    # seconds after end_date leaderboards are precomputed
+
+# NLP models, loaded lazily on first use (see competition.ai.registry)
+GRAMMAR_LANGUAGE = 'en-US'
+TOPIC_MODEL_NAME = 'all-MiniLM-L6-v2'
+# Essays encoded per forward pass by the topic similarity model
+TOPIC_BATCH_SIZE = 32
+# Persisted embeddings kept before least-recently-used eviction
+EMBEDDING_CACHE_MAX_ENTRIES = 100000
+# New entries (per process) between checks of that bound
+EMBEDDING_CACHE_EVICT_EVERY = 1000
+# Seconds before a lookup refreshes an entry's last_used_at again
+EMBEDDING_CACHE_TOUCH_INTERVAL = 3600
+# Load the models when the app starts (e.g. in scoring workers)
+NLP_WARM_ON_STARTUP = False
+# Use the fast deterministic models from competition.ai.stubs (offline runs)
+NLP_STUB_MODELS = False
+
+# Scoring profiles competitions can choose (see competition.scoring).
+# Weights are per component; changing them only recombines stored values.
+SCORING_PROFILES = {
+    'default': {
+        'weights': {'speed': 0.15, 'words': 0.15, 'grammar': 0.25, 'spelling': 0.15, 'topic': 0.30},
+        'optimal_words': 500,
+    },
+    'language_focus': {
+        'weights': {'speed': 0.05, 'words': 0.15, 'grammar': 0.35, 'spelling': 0.25, 'topic': 0.20},
+        'optimal_words': 500,
+    },
+}
+# Modules defining extra components with @competition.scoring.register
+SCORING_COMPONENT_MODULES = []
+
+# Near-duplicate essay detection (see competition.duplicates)
+DUPLICATE_SHINGLE_SIZE = 5    # words per shingle
+DUPLICATE_NUM_PERM = 128      # MinHash values per signature
+DUPLICATE_LSH_BANDS = 32      # must divide DUPLICATE_NUM_PERM; more bands, more recall
+DUPLICATE_THRESHOLD = 0.5     # estimated Jaccard similarity reported as a duplicate
+
+# Per-competition essay embedding index (see competition.ai.vector_index)
+VECTOR_INDEX_DIR = BASE_DIR / 'vector_index'
+# Rows above which queries shortlist by sign codes before exact ranking
+VECTOR_APPROXIMATE_MIN_ROWS = 20000
+# Cosine similarity flagged as a possible paraphrase in the admin
+VECTOR_PARAPHRASE_THRESHOLD = 0.9
+
+# Bulk user import (see custom_admin.user_import)
+USER_IMPORT_BATCH_SIZE = 500     # users inserted per bulk_create
+USER_IMPORT_HASH_WORKERS = 4     # threads hashing passwords
+
+# Retries of a paragraph submission that lost a database lock race
+# (see competition.submissions); the delay grows with each attempt
+SUBMISSION_LOCK_RETRIES = 3
+SUBMISSION_RETRY_DELAY = 0.05   # seconds
+
+# Shared by every process on the host (web server, scoring worker,
+# scheduler, commands) so invalidations made outside the web process reach
+# it. Point at Redis or Memcached when serving from several hosts. Tests
+# and scratch-database commands swap in a private in-memory cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+TEST_RUNNER = 'competition.testing.TestRunner'
+
+# Seconds the admin dashboard counts are cached (see competition.stats)
+DASHBOARD_STATS_TTL = 60
+# Seconds cached competition list/leaderboard fragments live (see
+# competition.fragments). Invalidation is by version number bumped from
+# the worker and scheduler processes, so the cache must be shared (CACHES).
+FRAGMENT_CACHE_TTL = 3600
+
+# Per-request query/DB/NLP timing (see competition.metrics)
+REQUEST_METRICS_HEADERS = DEBUG
+# Maximum SQL queries per request, keyed by URL name; enforced in tests
+VIEW_QUERY_BUDGETS = {
+    'leaderboard': 4,
+    'essay_write': 13,
+    'essay_view': 7,
+    'competition_list': 4,
+    'custom_admin:dashboard': 10,
+    'custom_admin:essays': 6,
+    'custom_admin:users': 5,
+    'custom_admin:essay_detail': 8,
+    'custom_admin:essay_search': 5,
+    'custom_admin:essay_similar': 5,
+}
+# Seconds the filtered result totals on admin list pages are cached
+ADMIN_COUNT_CACHE_TTL = 60